@@ -4,14 +4,22 @@ PriceHunter CLI - Command line interface for price comparison.
 """
 
 import asyncio
-import json
 import sys
 from typing import Dict, Any
 import argparse
+import orjson
 from loguru import logger
 
+try:
+    import uvloop
+except ImportError:  # Not available on Windows
+    uvloop = None
+
 from src.core.price_fetcher import PriceFetcher, SearchRequest
 
+# Short clock-only timestamp; loguru's full default date format is costly per line
+LOG_FORMAT = "<green>{time:HH:mm:ss}</green> | {level} | {message}"
+
 
 async def search_prices(country: str, query: str) -> Dict[str, Any]:
     """Search for product prices."""
@@ -19,16 +27,15 @@ async def search_prices(country: str, query: str) -> Dict[str, Any]:
 
     try:
         # Initialize price fetcher
-        fetcher = PriceFetcher()
+        async with PriceFetcher() as fetcher:
+            # Create search request
+            request = SearchRequest(
+                country=country,
+                query=query
+            )
 
-        # Create search request
-        request = SearchRequest(
-            country=country,
-            query=query
-        )
-
-        # Perform search
-        response = await fetcher.search(request)
+            # Perform search
+            response = await fetcher.search(request)
 
         return {
             "success": True,
@@ -124,28 +131,39 @@ Examples:
 
     args = parser.parse_args()
 
-    # Configure logging
+    # Configure logging (enqueue hands writes to a background thread so
+    # they never block the event loop)
     if args.verbose:
         logger.remove()
-        logger.add(sys.stderr, level="DEBUG")
+        logger.add(sys.stderr, format=LOG_FORMAT, level="DEBUG", enqueue=True)
     else:
         logger.remove()
-        logger.add(sys.stderr, level="INFO")
+        logger.add(sys.stderr, format=LOG_FORMAT, level="INFO", enqueue=True)
 
-    # Perform search
-    print("🔍 Searching for best prices...")
-    response = await search_prices(args.country, args.query)
-
-    # Output results
-    if args.json:
-        print(json.dumps(response, indent=2))
-    else:
-        print(format_results(response))
+    try:
+        # Perform search
+        print("🔍 Searching for best prices...")
+        response = await search_prices(args.country, args.query)
+
+        # Output results
+        if args.json:
+            # Write the encoded bytes straight to stdout, no intermediate str
+            sys.stdout.flush()
+            sys.stdout.buffer.write(orjson.dumps(response, option=orjson.OPT_INDENT_2))
+            sys.stdout.buffer.write(b"\n")
+        else:
+            print(format_results(response))
+    finally:
+        # Flush any queued log messages before exiting
+        await logger.complete()
 
 
 if __name__ == "__main__":
     try:
-        asyncio.run(main())
+        if uvloop is not None:
+            uvloop.run(main())
+        else:
+            asyncio.run(main())
     except KeyboardInterrupt:
         print("\n❌ Search cancelled by user")
         sys.exit(1)
@@ -8,6 +8,11 @@ import asyncio
 import json
 from datetime import datetime
 
+try:
+    import uvloop
+except ImportError:  # Not available on Windows
+    uvloop = None
+
 from src.rag import RAGEngine, ProductKnowledgeBase, QueryEnhancer
 
 
@@ -130,8 +135,8 @@ async def demo_knowledge_search():
         results = kb.search_knowledge(query, top_k=2)
         
         for i, result in enumerate(results, 1):
-            print(f"   {i}. Score: {result['relevance_score']:.3f}")
-            print(f"      {result['content'][:100]}...")
+            print(f"   {i}. Score: {result.relevance_score:.3f}")
+            print(f"      {result.content[:100]}...")
 
 
 async def demo_price_insights():
@@ -244,4 +249,7 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    if uvloop is not None:
+        uvloop.run(main())
+    else:
+        asyncio.run(main())
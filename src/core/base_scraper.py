@@ -7,12 +7,43 @@ from abc import ABC, abstractmethod
 from typing import List, Dict, Any, Optional, Union
 from dataclasses import dataclass
 from enum import Enum
+from functools import lru_cache
+from urllib.parse import quote_plus
 import asyncio
 import aiohttp
+import sys
 import time
 import random
 from loguru import logger
-from fake_useragent import UserAgent
+
+from ._user_agents import USER_AGENTS
+
+
+# Static part of the request headers; only the User-Agent varies per call
+_BASE_HEADERS = {
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+}
+
+
+def _make_resolver() -> aiohttp.abc.AbstractResolver:
+    """Prefer the aiodns resolver; fall back to getaddrinfo in a thread."""
+    # aiodns needs a selector event loop, which isn't the default on Windows
+    if sys.platform != "win32":
+        try:
+            return aiohttp.AsyncResolver()
+        except (ImportError, RuntimeError):
+            pass
+    return aiohttp.ThreadedResolver()
+
+
+@lru_cache(maxsize=256)
+def _quote_query(query: str) -> str:
+    """Percent-encode a search query for use in a URL."""
+    return quote_plus(query)
 
 
 class ScraperType(Enum):
@@ -23,7 +54,7 @@ class ScraperType(Enum):
     SPECIALIZED = "specialized"
 
 
-@dataclass
+@dataclass(slots=True)
 class ProductResult:
     """Standardized product result structure."""
     link: str
@@ -91,7 +122,7 @@ class BaseScraper(ABC):
         self.rate_limit = rate_limit
         self.timeout = timeout
         self.session: Optional[aiohttp.ClientSession] = None
-        self.user_agent = UserAgent()
+        self._resolver: Optional[aiohttp.abc.AbstractResolver] = None
         self.last_request_time = 0
 
     async def __aenter__(self):
@@ -106,41 +137,59 @@ class BaseScraper(ABC):
     async def initialize(self):
         """Initialize the scraper session."""
         if not self.session:
-            connector = aiohttp.TCPConnector(limit=10, limit_per_host=5)
+            # The connector doesn't close resolvers it didn't create
+            self._resolver = _make_resolver()
+            connector = aiohttp.TCPConnector(
+                limit=100,
+                limit_per_host=10,
+                ttl_dns_cache=600,
+                keepalive_timeout=60,
+                resolver=self._resolver
+            )
             timeout = aiohttp.ClientTimeout(total=self.timeout)
             self.session = aiohttp.ClientSession(
                 connector=connector,
                 timeout=timeout,
                 headers=self._get_headers()
             )
-            logger.info(f"Initialized {self.name} scraper")
+            logger.info("Initialized {} scraper", self.name)
 
     async def cleanup(self):
         """Cleanup the scraper session."""
         if self.session:
             await self.session.close()
             self.session = None
-            logger.info(f"Cleaned up {self.name} scraper")
+            if self._resolver:
+                await self._resolver.close()
+                self._resolver = None
+            logger.info("Cleaned up {} scraper", self.name)
+
+    def _pick_ua(self) -> str:
+        """Pick a User-Agent string from the static pool."""
+        return USER_AGENTS[random.randrange(len(USER_AGENTS))]
 
     def _get_headers(self) -> Dict[str, str]:
         """Get randomized headers for requests."""
-        return {
-            'User-Agent': self.user_agent.random,
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Accept-Encoding': 'gzip, deflate',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-        }
+        return {'User-Agent': self._pick_ua(), **_BASE_HEADERS}
+
+    def _encode_query(self, query: str, **kwargs) -> str:
+        """Percent-encode the query, reusing the fetcher's pre-encoded copy if given."""
+        encoded_query = kwargs.get('encoded_query')
+        if encoded_query is None:
+            encoded_query = _quote_query(query)
+        return encoded_query
 
     async def _rate_limit_delay(self):
         """Apply rate limiting delay."""
-        current_time = time.time()
+        current_time = time.monotonic()
         time_since_last = current_time - self.last_request_time
         if time_since_last < self.rate_limit:
-            delay = self.rate_limit - time_since_last + random.uniform(0.1, 0.5)
+            delay = self.rate_limit - time_since_last + 0.1 + random.random() * 0.4
+            # Record when the request will actually go out, before sleeping
+            self.last_request_time = current_time + delay
             await asyncio.sleep(delay)
-        self.last_request_time = time.time()
+        else:
+            self.last_request_time = current_time
 
     @abstractmethod
     async def search(self, query: str, country: str, **kwargs) -> List[ProductResult]:
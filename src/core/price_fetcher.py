@@ -4,19 +4,46 @@ This is the core component that coordinates price fetching from multiple sources
 """
 
 import asyncio
+import importlib
+import sys
 import time
-from typing import List, Dict, Any, Optional, Set
+from typing import List, Dict, Any, Optional, Set, Tuple
 from dataclasses import dataclass
 from datetime import datetime
 from loguru import logger
 import os
-from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote_plus
 
 from .base_scraper import BaseScraper, ProductResult, ScraperType
-from .result_processor import ResultProcessor
+from .result_processor import ResultProcessor, ProcessedResult
 from ..rag import RAGEngine, RAGInsight, EnhancedQuery
 
 
+def _start_task(coro) -> asyncio.Task:
+    """Schedule a coroutine, starting it eagerly where supported (3.12+)."""
+    loop = asyncio.get_running_loop()
+    if sys.version_info >= (3, 12):
+        return asyncio.eager_task_factory(loop, coro)
+    return loop.create_task(coro)
+
+
+# Built-in scrapers as (module, class name, supported countries). Modules are
+# only imported once a search targets one of their countries.
+_SCRAPER_REGISTRY = (
+    ("..scrapers.ecommerce.amazon_scraper", "AmazonScraper",
+     ("US", "CA", "UK", "DE", "FR", "IT", "ES", "JP", "IN", "AU", "BR", "MX")),
+    ("..scrapers.ecommerce.ebay_scraper", "EbayScraper",
+     ("US", "CA", "UK", "DE", "FR", "IT", "ES", "AU", "IN", "SG", "MY", "PH")),
+    ("..scrapers.ecommerce.bestbuy_scraper", "BestBuyScraper", ("US",)),
+    ("..scrapers.ecommerce.walmart_scraper", "WalmartScraper", ("US",)),
+    ("..scrapers.ecommerce.target_scraper", "TargetScraper", ("US",)),
+    ("..scrapers.ecommerce.flipkart_scraper", "FlipkartScraper", ("IN",)),
+    ("..scrapers.ecommerce.amazon_india_scraper", "AmazonIndiaScraper", ("IN",)),
+    ("..scrapers.regional.apple_store_scraper", "AppleStoreScraper", ("US", "UK", "CA", "AU", "IN")),
+    ("..scrapers.regional.sangeetha_scraper", "SangeethaScraper", ("IN",)),
+)
+
+
 @dataclass
 class SearchRequest:
     """Search request structure."""
@@ -46,64 +73,77 @@ class SearchResponse:
 class PriceFetcher:
     """Main price fetching engine."""
 
-    def __init__(self, max_concurrent_scrapers: int = 10, enable_rag: bool = True):
+    def __init__(self, max_concurrent_scrapers: int = 10, enable_rag: bool = True,
+                 scrapers: Optional[List[BaseScraper]] = None):
         """
         Initialize the PriceFetcher.
 
         Args:
             max_concurrent_scrapers: Maximum number of concurrent scrapers
             enable_rag: Whether to enable RAG features
+            scrapers: Scrapers to use instead of the built-in registry
         """
-        self.scrapers: List[BaseScraper] = []
+        self.scrapers: List[BaseScraper] = list(scrapers) if scrapers is not None else []
         self.result_processor = ResultProcessor()
         self.max_concurrent_scrapers = max_concurrent_scrapers
-        self.executor = ThreadPoolExecutor(max_workers=max_concurrent_scrapers)
+
+        # Built-in scrapers are loaded per country on first use
+        self._use_registry = scrapers is None
+        self._loaded_countries: Set[str] = set()
+        self._registry_seen: Set[str] = set()
 
         # Initialize RAG engine
         self.enable_rag = enable_rag
         self.rag_engine = RAGEngine() if enable_rag else None
 
-        # Load scrapers
-        self._load_scrapers()
-
-    def _load_scrapers(self):
-        """Load all available scrapers."""
-        logger.info("Loading scrapers...")
-
-        # Import and register scrapers
-        try:
-            # E-commerce scrapers
-            from ..scrapers.ecommerce.amazon_scraper import AmazonScraper
-            from ..scrapers.ecommerce.ebay_scraper import EbayScraper
-            from ..scrapers.ecommerce.bestbuy_scraper import BestBuyScraper
-            from ..scrapers.ecommerce.walmart_scraper import WalmartScraper
-            from ..scrapers.ecommerce.target_scraper import TargetScraper
-            from ..scrapers.ecommerce.flipkart_scraper import FlipkartScraper
-            from ..scrapers.ecommerce.amazon_india_scraper import AmazonIndiaScraper
-
-            # Regional scrapers
-            from ..scrapers.regional.apple_store_scraper import AppleStoreScraper
-            from ..scrapers.regional.sangeetha_scraper import SangeethaScraper
-
-            # Register scrapers
-            scraper_classes = [
-                AmazonScraper, EbayScraper, BestBuyScraper, WalmartScraper,
-                TargetScraper, FlipkartScraper, AmazonIndiaScraper,
-                AppleStoreScraper, SangeethaScraper
-            ]
-
-            for scraper_class in scraper_classes:
-                try:
-                    scraper = scraper_class()
-                    self.scrapers.append(scraper)
-                    logger.info(f"Loaded scraper: {scraper.name}")
-                except Exception as e:
-                    logger.warning(f"Failed to load scraper {scraper_class.__name__}: {e}")
-
-        except ImportError as e:
-            logger.warning(f"Some scrapers not available: {e}")
-
-        logger.info(f"Loaded {len(self.scrapers)} scrapers")
+    def _load_scrapers(self, country: str):
+        """Load the built-in scrapers that serve a country."""
+        country = country.upper()
+        if not self._use_registry or country in self._loaded_countries:
+            return
+        self._loaded_countries.add(country)
+
+        logger.info(f"Loading scrapers for {country}...")
+        loaded = 0
+
+        for module_path, class_name, countries in _SCRAPER_REGISTRY:
+            # Each class is tried once, whichever country asks for it first
+            if country not in countries or class_name in self._registry_seen:
+                continue
+            self._registry_seen.add(class_name)
+
+            try:
+                module = importlib.import_module(module_path, __package__)
+                scraper_class = getattr(module, class_name)
+            except (ImportError, AttributeError) as e:
+                logger.warning(f"Scraper {class_name} not available: {e}")
+                continue
+
+            try:
+                scraper = scraper_class()
+                self.scrapers.append(scraper)
+                loaded += 1
+                logger.info(f"Loaded scraper: {scraper.name}")
+            except Exception as e:
+                logger.warning(f"Failed to load scraper {class_name}: {e}")
+
+        logger.info(f"Loaded {loaded} scrapers for {country}")
+
+    async def __aenter__(self):
+        """Async context manager entry."""
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        """Async context manager exit."""
+        await self.aclose()
+
+    async def aclose(self):
+        """Close the HTTP sessions held open by the scrapers."""
+        for scraper in self.scrapers:
+            try:
+                await scraper.cleanup()
+            except Exception as e:
+                logger.warning(f"Failed to clean up scraper {scraper.name}: {e}")
 
     def register_scraper(self, scraper: BaseScraper):
         """Register a new scraper."""
@@ -112,6 +152,8 @@ class PriceFetcher:
 
     def get_available_scrapers(self, country: str) -> List[BaseScraper]:
         """Get scrapers available for a specific country."""
+        self._load_scrapers(country)
+
         available = []
         for scraper in self.scrapers:
             if scraper.is_supported_country(country):
@@ -140,66 +182,91 @@ class PriceFetcher:
             search_query = enhanced_query.enhanced_query
             logger.info(f"RAG enhanced query: '{search_query}' (confidence: {enhanced_query.confidence_score:.3f})")
 
+        # Encode the query once; every scraper puts it in its search URL
+        encoded_query = quote_plus(search_query)
+
+        # One timestamp for every result this search produces
+        scraped_at = datetime.now().isoformat()
+
         # Get available scrapers for the country
         available_scrapers = self.get_available_scrapers(request.country)
 
         # Filter scrapers based on include/exclude lists
         if request.include_sources:
-            available_scrapers = [
-                s for s in available_scrapers
-                if s.name.lower() in [src.lower() for src in request.include_sources]
-            ]
+            include = frozenset(src.lower() for src in request.include_sources)
+            available_scrapers = [s for s in available_scrapers if s.name.lower() in include]
         if request.exclude_sources:
-            available_scrapers = [
-                s for s in available_scrapers
-                if s.name.lower() not in [src.lower() for src in request.exclude_sources]
-            ]
+            exclude = frozenset(src.lower() for src in request.exclude_sources)
+            available_scrapers = [s for s in available_scrapers if s.name.lower() not in exclude]
 
         # Sort scrapers by priority
         available_scrapers.sort(key=lambda s: s.get_priority(request.country))
 
         logger.info(f"Using {len(available_scrapers)} scrapers: {[s.name for s in available_scrapers]}")
 
-        # Execute searches concurrently
-        all_results = []
-        sources_used = []
-
         # Limit concurrent scrapers
         semaphore = asyncio.Semaphore(self.max_concurrent_scrapers)
 
-        async def run_scraper(scraper: BaseScraper) -> List[ProductResult]:
+        async def run_scraper(scraper: BaseScraper) -> Optional[Tuple[str, List[ProductResult]]]:
             """Run a single scraper with semaphore control."""
             async with semaphore:
                 try:
-                    async with scraper:
-                        results = await asyncio.wait_for(
-                            scraper.search(search_query, request.country),
-                            timeout=request.timeout / len(available_scrapers)
-                        )
-                        sources_used.append(scraper.name)
-                        logger.info(f"{scraper.name}: Found {len(results)} results")
-                        return results
-                except asyncio.TimeoutError:
-                    logger.warning(f"{scraper.name}: Timeout")
-                    return []
+                    # Sessions stay open across searches so connections and
+                    # DNS lookups are reused; aclose() tears them down
+                    if scraper.session is None:
+                        await scraper.initialize()
+                    results = await scraper.search(
+                        search_query, request.country,
+                        encoded_query=encoded_query, scraped_at=scraped_at
+                    )
+                    logger.info("{}: Found {} results", scraper.name, len(results))
+                    return scraper.name, results
                 except Exception as e:
-                    logger.error(f"{scraper.name}: Error - {e}")
-                    return []
-
-        # Run all scrapers concurrently
-        tasks = [run_scraper(scraper) for scraper in available_scrapers]
-        scraper_results = await asyncio.gather(*tasks, return_exceptions=True)
-
-        # Collect all results
-        for results in scraper_results:
-            if isinstance(results, list):
-                all_results.extend(results)
-
-        logger.info(f"Collected {len(all_results)} total results")
+                    logger.error("{}: Error - {}", scraper.name, e)
+                    return None
+
+        # Run all scrapers concurrently, normalizing each batch as it lands
+        # so post-processing overlaps with the slower scrapers
+        tasks = [_start_task(run_scraper(scraper)) for scraper in available_scrapers]
+        task_index = {task: i for i, task in enumerate(tasks)}
+        batches: List[List[ProcessedResult]] = [[] for _ in tasks]
+        sources_used = []
+        total_collected = 0
 
-        # Process and rank results
-        processed_results = self.result_processor.process_results(
-            all_results, request.query, request.target_currency
+        # One deadline for the whole fan-out, so every scraper gets the full
+        # budget instead of an equal slice of it
+        pending = set(tasks)
+        try:
+            async with asyncio.timeout(request.timeout):
+                while pending:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        outcome = task.result()
+                        if outcome is None:
+                            continue
+                        name, results = outcome
+                        sources_used.append(name)
+                        total_collected += len(results)
+                        batches[task_index[task]] = self.result_processor.stream_add(
+                            results, request.query, request.target_currency
+                        )
+        except TimeoutError:
+            logger.warning(
+                "Search timed out after {}s; {} scrapers still running",
+                request.timeout, len(pending)
+            )
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        logger.info(f"Collected {total_collected} total results")
+
+        # Deduplicate and rank, keeping scraper priority order for ties. The
+        # pairwise matrices are built off the event loop so other searches
+        # sharing it are not stalled
+        processed_results = await asyncio.to_thread(
+            self.result_processor.finalize,
+            [processed for batch in batches for processed in batch], request.query
         )
 
         # Limit results
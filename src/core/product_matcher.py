@@ -4,17 +4,63 @@ Advanced product matching system using ML and NLP techniques.
 Provides sophisticated product similarity scoring and duplicate detection.
 """
 
+import os
 import re
-from typing import List, Dict, Tuple, Optional
+from functools import lru_cache
+from typing import List, Dict, Tuple, Optional, Iterable
 from dataclasses import dataclass
 
-from fuzzywuzzy import fuzz
+import numpy as np
+from diskcache import Cache
+from rapidfuzz import fuzz, process, utils
 from loguru import logger
 
 
-@dataclass
+# Extracted features persist here across runs. Bump the version whenever the
+# extraction rules change so entries written by older code are ignored
+FEATURE_CACHE_DIR = os.path.join("cache", "features")
+_FEATURES_VERSION = 1
+
+# Weights of the components combined by ProductMatcher.calculate_similarity
+_SIMILARITY_WEIGHTS = {
+    'fuzzy': 0.3,
+    'brand': 0.25,
+    'model': 0.2,
+    'storage': 0.1,
+    'color': 0.05,
+    'query_relevance': 0.1
+}
+
+# Highest score the non-fuzzy components can add when there is no query
+# (query relevance is then a flat 0.5)
+_NON_FUZZY_MAX = (
+    sum(w for key, w in _SIMILARITY_WEIGHTS.items() if key not in ('fuzzy', 'query_relevance'))
+    + _SIMILARITY_WEIGHTS['query_relevance'] * 0.5
+)
+
+# Products of two different known brands are never the same product; their
+# similarity is just the fuzzy name score scaled down to at most this
+_BRAND_MISMATCH_MAX = 0.4
+
+# Batches larger than this spread the pairwise matrix over all cores
+_PARALLEL_MIN_PRODUCTS = 128
+
+_WORD_RE = re.compile(r'\w+')
+
+
+@lru_cache(maxsize=4096)
+def _prepare(text: str) -> Tuple[str, str]:
+    """Return text lowercased and as its sorted, normalized tokens.
+
+    ``fuzz.ratio`` on the sorted form equals ``fuzz.token_sort_ratio`` with
+    the default processor, so each name is only tokenized once.
+    """
+    return text.lower(), ' '.join(sorted(utils.default_process(text).split()))
+
+
+@dataclass(frozen=True, slots=True)
 class ProductFeatures:
-    """Extracted product features for matching."""
+    """Extracted product features for matching (immutable, so safe to cache)."""
     brand: Optional[str] = None
     model: Optional[str] = None
     variant: Optional[str] = None
@@ -22,32 +68,35 @@ class ProductFeatures:
     color: Optional[str] = None
     size: Optional[str] = None
     category: Optional[str] = None
-    key_specs: List[str] = None
-
-    def __post_init__(self):
-        if self.key_specs is None:
-            self.key_specs = []
+    key_specs: Tuple[str, ...] = ()
 
 
 class ProductMatcher:
     """Advanced product matching and similarity scoring."""
 
-    def __init__(self):
-        """Initialize the product matcher."""
-        self.brand_patterns = {
-            'apple': r'\b(apple|iphone|ipad|macbook|imac|airpods)\b',
-            'samsung': r'\b(samsung|galaxy)\b',
-            'oneplus': r'\b(oneplus|one\s*plus)\b',
-            'xiaomi': r'\b(xiaomi|mi|redmi)\b',
-            'oppo': r'\b(oppo)\b',
-            'vivo': r'\b(vivo)\b',
-            'realme': r'\b(realme)\b',
-            'google': r'\b(google|pixel)\b',
-            'sony': r'\b(sony|xperia)\b',
-            'lg': r'\b(lg)\b',
-            'motorola': r'\b(motorola|moto)\b',
-            'nokia': r'\b(nokia)\b',
-            'huawei': r'\b(huawei|honor)\b',
+    def __init__(self, feature_cache_dir: Optional[str] = FEATURE_CACHE_DIR):
+        """
+        Initialize the product matcher.
+
+        Args:
+            feature_cache_dir: Directory for the on-disk feature cache, or
+                None to keep features in memory only
+        """
+        # Brand -> aliases; when several brands occur, the one listed first wins
+        self.brand_aliases = {
+            'apple': ('apple', 'iphone', 'ipad', 'macbook', 'imac', 'airpods'),
+            'samsung': ('samsung', 'galaxy'),
+            'oneplus': ('oneplus', 'one plus'),
+            'xiaomi': ('xiaomi', 'mi', 'redmi'),
+            'oppo': ('oppo',),
+            'vivo': ('vivo',),
+            'realme': ('realme',),
+            'google': ('google', 'pixel'),
+            'sony': ('sony', 'xperia'),
+            'lg': ('lg',),
+            'motorola': ('motorola', 'moto'),
+            'nokia': ('nokia',),
+            'huawei': ('huawei', 'honor'),
         }
 
         self.storage_patterns = {
@@ -55,9 +104,11 @@ class ProductMatcher:
             'ram': r'\b(\d+)\s*gb\s*(ram|memory)\b',
         }
 
-        self.color_patterns = {
-            'colors': r'\b(black|white|blue|red|green|gold|silver|rose|pink|purple|yellow|orange|gray|grey|titanium|natural|pro|max)\b'
-        }
+        # The first of these words in the text is taken as the color
+        self.color_words = (
+            'black', 'white', 'blue', 'red', 'green', 'gold', 'silver', 'rose', 'pink',
+            'purple', 'yellow', 'orange', 'gray', 'grey', 'titanium', 'natural', 'pro', 'max',
+        )
 
         self.model_patterns = {
             'iphone': r'\biphone\s*(\d+(?:\s*pro)?(?:\s*max)?)\b',
@@ -65,30 +116,110 @@ class ProductMatcher:
             'pixel': r'\bpixel\s*(\d+(?:\s*pro)?(?:\s*xl)?)\b',
         }
 
+        self.category_aliases = {
+            'smartphone': ('phone', 'smartphone', 'mobile'),
+            'laptop': ('laptop', 'notebook', 'macbook'),
+            'tablet': ('tablet', 'ipad'),
+            'headphones': ('headphones', 'earphones', 'airpods', 'earbuds'),
+            'watch': ('watch', 'smartwatch'),
+        }
+
+        # Brands, categories and colors are plain words, so they are looked up
+        # per token in a dict instead of sweeping the text with one regex each
+        self._brand_lookup = self._build_lookup(self.brand_aliases)
+        self._category_lookup = self._build_lookup(self.category_aliases)
+        self._color_lookup = {word: word for word in self.color_words}
+
+        # Precompiled matchers
+        self._storage_re = re.compile(self.storage_patterns['storage'], re.IGNORECASE)
+        # RAM, camera and display specs in one pass; the named group says which
+        self._specs_re = re.compile(
+            r'\b(?P<ram>\d+)\s*gb\s*(?:ram|memory)\b'
+            r'|\b(?P<camera>\d+)\s*mp\b'
+            r'|\b(?P<display>\d+\.?\d*)\s*inch\b',
+            re.IGNORECASE
+        )
+        self._model_res = {
+            name: re.compile(pattern, re.IGNORECASE)
+            for name, pattern in self.model_patterns.items()
+        }
+        self._model_generic_re = re.compile(r'\b([a-z]+\s*\d+(?:\s*[a-z]+)*)\b', re.IGNORECASE)
+
+        # Catalogs are scraped repeatedly, so features also persist on disk;
+        # the in-memory LRU sits in front for pairwise comparisons
+        self._disk_cache: Optional[Cache] = None
+        if feature_cache_dir:
+            try:
+                self._disk_cache = Cache(feature_cache_dir, eviction_policy='least-recently-used')
+            except Exception as e:
+                logger.warning(f"Feature cache unavailable at {feature_cache_dir}: {e}")
+        self._features_cached = lru_cache(maxsize=4096)(self._load_features)
+
+    @staticmethod
+    def _build_lookup(aliases: Dict[str, Tuple[str, ...]]) -> Dict[str, str]:
+        """Map every alias to its canonical name."""
+        return {alias: name for name, names in aliases.items() for alias in names}
+
+    @staticmethod
+    def _lookup_words(text: str, lookup: Dict[str, str]) -> List[str]:
+        """Return the canonical names of all aliases found in text, in text order.
+
+        Aliases match whole words only; two-word aliases ("one plus") match
+        words separated by whitespace alone.
+        """
+        found = []
+        prev_word, prev_end = None, 0
+        for match in _WORD_RE.finditer(text):
+            word = match.group()
+            if prev_word is not None and text[prev_end:match.start()].isspace():
+                name = lookup.get(f"{prev_word} {word}")
+                if name is not None:
+                    found.append(name)
+            name = lookup.get(word)
+            if name is not None:
+                found.append(name)
+            prev_word, prev_end = word, match.end()
+        return found
+
+    @staticmethod
+    def _first_listed(found: List[str], names: Iterable[str]) -> Optional[str]:
+        """Return the earliest-listed name among those found."""
+        if found:
+            found = set(found)
+            for name in names:
+                if name in found:
+                    return name
+        return None
+
     def extract_features(self, product_name: str, query: str = "") -> ProductFeatures:
         """Extract structured features from product name and query."""
-        text = f"{product_name} {query}".lower()
-        features = ProductFeatures()
+        return self._features_cached(f"{product_name} {query}".lower())
+
+    def _load_features(self, text: str) -> ProductFeatures:
+        """Return features for lowercased text from the disk cache, extracting on a miss."""
+        if self._disk_cache is None:
+            return self._extract_features(text)
+
+        key = (_FEATURES_VERSION, text)
+        features = self._disk_cache.get(key)
+        if features is None:
+            features = self._extract_features(text)
+            self._disk_cache.set(key, features)
+        return features
 
+    def _extract_features(self, text: str) -> ProductFeatures:
+        """Extract features from lowercased text."""
         # Extract brand
-        features.brand = self._extract_brand(text)
-
-        # Extract model
-        features.model = self._extract_model(text, features.brand)
-
-        # Extract storage
-        features.storage = self._extract_storage(text)
+        brand = self._extract_brand(text)
 
-        # Extract color
-        features.color = self._extract_color(text)
-
-        # Extract category
-        features.category = self._extract_category(text)
-
-        # Extract key specifications
-        features.key_specs = self._extract_key_specs(text)
-
-        return features
+        return ProductFeatures(
+            brand=brand,
+            model=self._extract_model(text, brand),
+            storage=self._extract_storage(text),
+            color=self._extract_color(text),
+            category=self._extract_category(text),
+            key_specs=self._extract_key_specs(text)
+        )
 
     def calculate_similarity(self, product1: str, product2: str, query: str = "") -> float:
         """Calculate sophisticated similarity score between two products."""
@@ -96,11 +227,18 @@ class ProductMatcher:
         features1 = self.extract_features(product1, query)
         features2 = self.extract_features(product2, query)
 
+        lower1, sorted1 = _prepare(product1)
+        lower2, sorted2 = _prepare(product2)
+
+        # Different brands: skip the remaining components
+        if features1.brand and features2.brand and features1.brand != features2.brand:
+            return _BRAND_MISMATCH_MAX * fuzz.ratio(sorted1, sorted2) / 100.0
+
         # Calculate different similarity components
         scores = {}
 
         # 1. Basic string similarity
-        scores['fuzzy'] = fuzz.token_sort_ratio(product1.lower(), product2.lower()) / 100.0
+        scores['fuzzy'] = fuzz.ratio(sorted1, sorted2) / 100.0
 
         # 2. Brand similarity
         scores['brand'] = self._compare_brands(features1.brand, features2.brand)
@@ -115,19 +253,10 @@ class ProductMatcher:
         scores['color'] = self._compare_colors(features1.color, features2.color)
 
         # 6. Query relevance
-        scores['query_relevance'] = self._calculate_query_relevance(product1, product2, query)
+        scores['query_relevance'] = self._calculate_query_relevance(lower1, lower2, query)
 
         # Weighted combination
-        weights = {
-            'fuzzy': 0.3,
-            'brand': 0.25,
-            'model': 0.2,
-            'storage': 0.1,
-            'color': 0.05,
-            'query_relevance': 0.1
-        }
-
-        final_score = sum(scores[key] * weights[key] for key in scores)
+        final_score = sum(scores[key] * _SIMILARITY_WEIGHTS[key] for key in scores)
         
         logger.debug(f"Similarity scores: {scores} -> {final_score:.3f}")
         return final_score
@@ -148,21 +277,17 @@ class ProductMatcher:
 
     def _extract_brand(self, text: str) -> Optional[str]:
         """Extract brand from text."""
-        for brand, pattern in self.brand_patterns.items():
-            if re.search(pattern, text, re.IGNORECASE):
-                return brand
-        return None
+        return self._first_listed(self._lookup_words(text, self._brand_lookup), self.brand_aliases)
 
     def _extract_model(self, text: str, brand: Optional[str]) -> Optional[str]:
         """Extract model from text."""
-        if brand and brand in self.model_patterns:
-            pattern = self.model_patterns[brand]
-            match = re.search(pattern, text, re.IGNORECASE)
+        if brand and brand in self._model_res:
+            match = self._model_res[brand].search(text)
             if match:
                 return match.group(1).strip()
         
         # Generic model extraction
-        model_match = re.search(r'\b([a-z]+\s*\d+(?:\s*[a-z]+)*)\b', text, re.IGNORECASE)
+        model_match = self._model_generic_re.search(text)
         if model_match:
             return model_match.group(1).strip()
         
@@ -170,53 +295,40 @@ class ProductMatcher:
 
     def _extract_storage(self, text: str) -> Optional[str]:
         """Extract storage information."""
-        storage_match = re.search(self.storage_patterns['storage'], text, re.IGNORECASE)
+        storage_match = self._storage_re.search(text)
         if storage_match:
             return f"{storage_match.group(1)}{storage_match.group(2).upper()}"
         return None
 
     def _extract_color(self, text: str) -> Optional[str]:
         """Extract color information."""
-        color_match = re.search(self.color_patterns['colors'], text, re.IGNORECASE)
-        if color_match:
-            return color_match.group(1).lower()
+        for match in _WORD_RE.finditer(text):
+            if match.group() in self._color_lookup:
+                return match.group()
         return None
 
     def _extract_category(self, text: str) -> Optional[str]:
         """Extract product category."""
-        categories = {
-            'smartphone': r'\b(phone|smartphone|mobile)\b',
-            'laptop': r'\b(laptop|notebook|macbook)\b',
-            'tablet': r'\b(tablet|ipad)\b',
-            'headphones': r'\b(headphones|earphones|airpods|earbuds)\b',
-            'watch': r'\b(watch|smartwatch)\b',
-        }
-        
-        for category, pattern in categories.items():
-            if re.search(pattern, text, re.IGNORECASE):
-                return category
-        return None
+        return self._first_listed(self._lookup_words(text, self._category_lookup), self.category_aliases)
 
-    def _extract_key_specs(self, text: str) -> List[str]:
+    def _extract_key_specs(self, text: str) -> Tuple[str, ...]:
         """Extract key specifications."""
+        # Keep the first match of each kind
+        found = {}
+        for match in self._specs_re.finditer(text):
+            found.setdefault(match.lastgroup, match.group(match.lastgroup))
+            if len(found) == 3:
+                break
+
         specs = []
+        if 'ram' in found:
+            specs.append(f"{found['ram']}GB RAM")
+        if 'camera' in found:
+            specs.append(f"{found['camera']}MP")
+        if 'display' in found:
+            specs.append(f"{found['display']}\"")
         
-        # RAM
-        ram_match = re.search(r'\b(\d+)\s*gb\s*(ram|memory)\b', text, re.IGNORECASE)
-        if ram_match:
-            specs.append(f"{ram_match.group(1)}GB RAM")
-        
-        # Camera
-        camera_match = re.search(r'\b(\d+)\s*mp\b', text, re.IGNORECASE)
-        if camera_match:
-            specs.append(f"{camera_match.group(1)}MP")
-        
-        # Display size
-        display_match = re.search(r'\b(\d+\.?\d*)\s*inch\b', text, re.IGNORECASE)
-        if display_match:
-            specs.append(f"{display_match.group(1)}\"")
-        
-        return specs
+        return tuple(specs)
 
     def _compare_brands(self, brand1: Optional[str], brand2: Optional[str]) -> float:
         """Compare brand similarity."""
@@ -247,18 +359,21 @@ class ProductMatcher:
         if not query:
             return 0.5
         
-        relevance1 = fuzz.partial_ratio(query.lower(), product1.lower()) / 100.0
-        relevance2 = fuzz.partial_ratio(query.lower(), product2.lower()) / 100.0
+        query_lower = query.lower()
+        relevance1 = fuzz.partial_ratio(query_lower, product1.lower()) / 100.0
+        relevance2 = fuzz.partial_ratio(query_lower, product2.lower()) / 100.0
         
         # Return average relevance
         return (relevance1 + relevance2) / 2.0
 
     def rank_products(self, products: List[Dict], query: str) -> List[Dict]:
         """Rank products by relevance to query."""
-        for product in products:
-            product_name = product.get('productName', '')
-            relevance = fuzz.partial_ratio(query.lower(), product_name.lower()) / 100.0
-            product['relevanceScore'] = relevance
+        # Score every name against the query in one batched call
+        names = [product.get('productName', '').lower() for product in products]
+        scored = process.extract(query.lower(), names, scorer=fuzz.partial_ratio,
+                                 processor=None, limit=None)
+        for _, score, index in scored:
+            products[index]['relevanceScore'] = score / 100.0
         
         # Sort by relevance score (descending)
         return sorted(products, key=lambda x: x.get('relevanceScore', 0), reverse=True)
@@ -267,7 +382,39 @@ class ProductMatcher:
         """Group similar products together."""
         groups = []
         used_indices = set()
-        
+        if not products:
+            return groups
+
+        names = [product.get('productName', '') for product in products]
+
+        # Pairs whose token sort ratio is too low to reach the threshold even
+        # with perfect brand/model/storage/color scores are skipped; the full
+        # matrix is computed in one batched call
+        fuzzy_cutoff = (threshold - _NON_FUZZY_MAX) / _SIMILARITY_WEIGHTS['fuzzy'] * 100
+        if fuzzy_cutoff > 0:
+            fuzzy_scores = process.cdist(
+                names, names,
+                scorer=fuzz.token_sort_ratio,
+                processor=utils.default_process,
+                score_cutoff=max(fuzzy_cutoff - 0.01, 0),
+                workers=-1 if len(names) > _PARALLEL_MIN_PRODUCTS else 1
+            )
+            candidates = fuzzy_scores >= fuzzy_cutoff - 0.01
+        else:
+            candidates = np.ones((len(names), len(names)), dtype=bool)
+
+        # Pairs of two known, different brands score at most
+        # _BRAND_MISMATCH_MAX; above that, drop them without scoring
+        if threshold > _BRAND_MISMATCH_MAX + 1e-4:
+            brand_ids: Dict[str, int] = {}
+            brands = np.fromiter(
+                (-1 if brand is None else brand_ids.setdefault(brand, len(brand_ids))
+                 for brand in (self.extract_features(name).brand for name in names)),
+                dtype=np.int64, count=len(names)
+            )
+            known = brands >= 0
+            candidates &= ~(known[:, None] & known[None, :] & (brands[:, None] != brands[None, :]))
+
         for i, product1 in enumerate(products):
             if i in used_indices:
                 continue
@@ -275,14 +422,13 @@ class ProductMatcher:
             group = [product1]
             used_indices.add(i)
             
-            for j, product2 in enumerate(products[i+1:], i+1):
+            for j in np.flatnonzero(candidates[i, i+1:]).tolist():
+                j += i + 1
                 if j in used_indices:
                     continue
-                    
-                similarity = self.calculate_similarity(
-                    product1.get('productName', ''),
-                    product2.get('productName', '')
-                )
+                product2 = products[j]
+
+                similarity = self.calculate_similarity(names[i], names[j])
                 
                 if similarity >= threshold:
                     group.append(product2)
@@ -4,12 +4,13 @@ Handles deduplication, price normalization, and intelligent ranking.
 """
 
 import re
-import hashlib
 from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass
 from datetime import datetime
 from loguru import logger
-from fuzzywuzzy import fuzz
+import numpy as np
+import xxhash
+from rapidfuzz import fuzz, process
 import price_parser
 from currency_converter import CurrencyConverter
 
@@ -17,6 +18,39 @@ from .base_scraper import ProductResult
 from .product_matcher import ProductMatcher
 
 
+# Source reliability used in ranking; unknown sources get the default
+_SOURCE_SCORES = {
+    'amazon': 0.9,
+    'apple': 0.95,
+    'bestbuy': 0.85,
+    'walmart': 0.8,
+    'target': 0.75,
+    'ebay': 0.7,
+}
+_DEFAULT_SOURCE_SCORE = 0.6
+
+# Availability strings (lowercased) that count as fully in stock
+_IN_STOCK = frozenset({'in stock', 'available'})
+
+# Batches larger than this spread the pairwise matrices over all cores
+_PARALLEL_MIN_RESULTS = 128
+
+# Plain decimal numbers, as the scrapers emit them. Exactly three fraction
+# digits are left to price_parser, which reads them as a thousands group
+_NUMERIC_PRICE = re.compile(r'\d+(?:\.(?:\d{1,2}|\d{4,}))?')
+
+
+def _parse_amount(text: str) -> Tuple[Optional[float], Optional[str]]:
+    """Parse a price string into (amount, currency symbol or code)."""
+    if _NUMERIC_PRICE.fullmatch(text):
+        return float(text), None
+
+    price_info = price_parser.parse_price(text)
+    if price_info.amount is None:
+        return None, price_info.currency
+    return float(price_info.amount), price_info.currency
+
+
 @dataclass
 class ProcessedResult:
     """Processed and normalized result."""
@@ -26,6 +60,7 @@ class ProcessedResult:
     similarity_score: float
     duplicate_group: Optional[str] = None
     final_rank: int = 0
+    cleaned_name: str = ""
 
 
 class ResultProcessor:
@@ -37,6 +72,8 @@ class ResultProcessor:
         self.product_matcher = ProductMatcher()
         self.duplicate_threshold = 0.85
         self.price_variance_threshold = 0.1
+        # (source, target) -> conversion rate, or None if unsupported
+        self._rate_cache: Dict[Tuple[str, str], Optional[float]] = {}
 
     def process_results(self,
                        results: List[ProductResult],
@@ -58,22 +95,86 @@ class ResultProcessor:
 
         logger.info(f"Processing {len(results)} results for query: {query}")
 
-        # Step 1: Normalize prices and currencies
-        processed_results = []
+        processed_results = self.stream_add(results, query, target_currency)
+        return self.finalize(processed_results, query)
+
+    def stream_add(self,
+                   results: List[ProductResult],
+                   query: str,
+                   target_currency: str = "USD") -> List[ProcessedResult]:
+        """
+        Normalize and score a batch of raw results.
+
+        Batches are independent of each other, so this can run on each
+        scraper's results as soon as they arrive. Pass the combined batches
+        to finalize() once all scrapers are done.
+
+        Args:
+            results: Raw results from a single scraper (or several)
+            query: Original search query
+            target_currency: Target currency for normalization
+
+        Returns:
+            List of normalized results with similarity scores
+        """
+        # Step 1: Parse prices, then convert the whole batch in one multiply
+        parsed = []
         for result in results:
             try:
-                processed = self._normalize_result(result, target_currency)
-                if processed:
-                    processed_results.append(processed)
+                price = self._parse_price(result, target_currency)
+                if price:
+                    parsed.append((result, *price))
             except Exception as e:
                 logger.warning(f"Failed to process result from {result.source}: {e}")
 
-        # Step 2: Calculate similarity scores
-        for processed in processed_results:
-            processed.similarity_score = self._calculate_similarity(
-                processed.original_result.product_name, query
+        rates = []
+        currencies = []
+        for _, _, source_currency in parsed:
+            rate = self._get_rate(source_currency, target_currency)
+            if rate is None:
+                # Unsupported currency: keep the original amount and currency
+                rates.append(1.0)
+                currencies.append(source_currency)
+            else:
+                rates.append(rate)
+                currencies.append(target_currency)
+
+        amounts = np.fromiter((amount for _, amount, _ in parsed), dtype=np.float64, count=len(parsed))
+        converted = (amounts * np.asarray(rates, dtype=np.float64)).tolist()
+
+        processed_results = [
+            ProcessedResult(
+                original_result=result,
+                normalized_price=price,
+                normalized_currency=currency,
+                similarity_score=0.0,  # Will be calculated below
+                cleaned_name=self._clean_text(result.product_name.lower())
             )
+            for (result, _, _), price, currency in zip(parsed, converted, currencies)
+        ]
+
+        # Step 2: Calculate similarity scores
+        if query:
+            clean_query = self._clean_text(query.lower())
+            for processed in processed_results:
+                if processed.original_result.product_name:
+                    processed.similarity_score = self._cleaned_similarity(
+                        processed.cleaned_name, clean_query
+                    )
+
+        return processed_results
+
+    def finalize(self, processed_results: List[ProcessedResult], query: str) -> List[Dict[str, Any]]:
+        """
+        Deduplicate and rank normalized results.
+
+        Args:
+            processed_results: Combined output of stream_add()
+            query: Original search query
 
+        Returns:
+            List of result dicts in ranked order
+        """
         # Step 3: Remove duplicates
         deduplicated = self._remove_duplicates(processed_results)
 
@@ -93,42 +194,35 @@ class ResultProcessor:
         logger.info(f"Processed results: {len(output_results)} final results")
         return output_results
 
-    def _normalize_result(self, result: ProductResult, target_currency: str) -> Optional[ProcessedResult]:
-        """Normalize a single result."""
+    def _parse_price(self, result: ProductResult, target_currency: str) -> Optional[Tuple[float, str]]:
+        """Parse a result's price into (amount, source currency)."""
         try:
-            # Parse price
-            price_info = price_parser.parse_price(result.price)
-            if not price_info or not price_info.amount:
+            price_amount, price_currency = _parse_amount(result.price)
+            if not price_amount:
                 logger.warning(f"Could not parse price: {result.price}")
                 return None
 
-            price_amount = float(price_info.amount)
-            source_currency = price_info.currency or result.currency or target_currency
-
-            # Convert currency if needed
-            if source_currency != target_currency:
-                try:
-                    converted_price = self.currency_converter.convert(
-                        price_amount, source_currency, target_currency
-                    )
-                except Exception as e:
-                    logger.warning(f"Currency conversion failed: {e}")
-                    converted_price = price_amount
-                    target_currency = source_currency
-            else:
-                converted_price = price_amount
-
-            return ProcessedResult(
-                original_result=result,
-                normalized_price=converted_price,
-                normalized_currency=target_currency,
-                similarity_score=0.0  # Will be calculated later
-            )
+            source_currency = price_currency or result.currency or target_currency
+            return price_amount, source_currency
 
         except Exception as e:
             logger.error(f"Error normalizing result: {e}")
             return None
 
+    def _get_rate(self, source_currency: str, target_currency: str) -> Optional[float]:
+        """Get the conversion rate between two currencies, cached per pair."""
+        if source_currency == target_currency:
+            return 1.0
+
+        key = (source_currency, target_currency)
+        if key not in self._rate_cache:
+            try:
+                self._rate_cache[key] = self.currency_converter.convert(1, source_currency, target_currency)
+            except Exception as e:
+                logger.warning(f"Currency conversion failed: {e}")
+                self._rate_cache[key] = None
+        return self._rate_cache[key]
+
     def _calculate_similarity(self, product_name: str, query: str) -> float:
         """Calculate similarity between product name and query."""
         if not product_name or not query:
@@ -138,6 +232,10 @@ class ResultProcessor:
         clean_product = self._clean_text(product_name.lower())
         clean_query = self._clean_text(query.lower())
 
+        return self._cleaned_similarity(clean_product, clean_query)
+
+    def _cleaned_similarity(self, clean_product: str, clean_query: str) -> float:
+        """Calculate similarity between two strings already passed through _clean_text."""
         # Calculate different similarity metrics
         token_sort_ratio = fuzz.token_sort_ratio(clean_product, clean_query)
         token_set_ratio = fuzz.token_set_ratio(clean_product, clean_query)
@@ -164,33 +262,52 @@ class ResultProcessor:
         if len(results) <= 1:
             return results
 
-        # Group similar results
-        groups = []
-        for result in results:
-            added_to_group = False
-
-            for group in groups:
-                # Check if this result is similar to any in the group
-                for group_result in group:
-                    similarity = self._calculate_similarity(
-                        result.original_result.product_name,
-                        group_result.original_result.product_name
-                    )
-
-                    # Also check price similarity
-                    price_diff = abs(result.normalized_price - group_result.normalized_price)
-                    price_similarity = 1.0 - (price_diff / max(result.normalized_price, group_result.normalized_price))
-
-                    if (similarity > self.duplicate_threshold and
-                        price_similarity > (1.0 - self.price_variance_threshold)):
-                        group.append(result)
-                        added_to_group = True
-                        break
-
-                if added_to_group:
-                    break
-
-            if not added_to_group:
+        n = len(results)
+
+        # Cheap pairwise checks first: price closeness and the brand/storage
+        # block must both agree before names are compared at all
+        prices = np.fromiter((result.normalized_price for result in results), dtype=np.float64, count=n)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            price_similarity = 1.0 - np.abs(prices[:, None] - prices[None, :]) / np.maximum(prices[:, None], prices[None, :])
+
+        block_ids: Dict[Tuple[Optional[str], Optional[str]], int] = {}
+        blocks = np.fromiter(
+            (block_ids.setdefault((features.brand, features.storage), len(block_ids))
+             for features in (self.product_matcher.extract_features(result.original_result.product_name)
+                              for result in results)),
+            dtype=np.int64, count=n
+        )
+
+        duplicate = (
+            (price_similarity > (1.0 - self.price_variance_threshold)) &
+            (blocks[:, None] == blocks[None, :])
+        )
+        np.fill_diagonal(duplicate, False)
+
+        # Name similarity (same weights as _cleaned_similarity), batched over
+        # just the results that still have a candidate pair
+        candidates = np.flatnonzero(duplicate.any(axis=1))
+        if candidates.size:
+            names = [results[i].cleaned_name for i in candidates.tolist()]
+            workers = -1 if len(names) > _PARALLEL_MIN_RESULTS else 1
+            similarity = (
+                process.cdist(names, names, scorer=fuzz.token_sort_ratio, dtype=np.float64, workers=workers) * 0.4 +
+                process.cdist(names, names, scorer=fuzz.token_set_ratio, dtype=np.float64, workers=workers) * 0.4 +
+                process.cdist(names, names, scorer=fuzz.partial_ratio, dtype=np.float64, workers=workers) * 0.2
+            ) / 100.0
+            duplicate[np.ix_(candidates, candidates)] &= similarity > self.duplicate_threshold
+
+        # Each result joins the earliest group holding a duplicate of it,
+        # as if results were added to groups one at a time
+        groups: List[List[ProcessedResult]] = []
+        group_of = np.empty(n, dtype=np.int64)
+        for i, result in enumerate(results):
+            matches = np.flatnonzero(duplicate[i, :i])
+            if matches.size:
+                group_of[i] = group_of[matches].min()
+                groups[group_of[i]].append(result)
+            else:
+                group_of[i] = len(groups)
                 groups.append([result])
 
         # Select best result from each group
@@ -200,9 +317,7 @@ class ResultProcessor:
             best_result = max(group, key=lambda x: (x.similarity_score, -x.normalized_price))
 
             # Mark duplicate group
-            group_id = hashlib.md5(
-                best_result.original_result.product_name.encode()
-            ).hexdigest()[:8]
+            group_id = xxhash.xxh64_hexdigest(best_result.original_result.product_name.encode())[:8]
             best_result.duplicate_group = group_id
 
             deduplicated.append(best_result)
@@ -216,12 +331,16 @@ class ResultProcessor:
             return results
 
         # Calculate ranking scores
-        for result in results:
-            score = self._calculate_ranking_score(result, query)
-            result.final_rank = score
+        prices = np.fromiter(
+            (result.normalized_price for result in results),
+            dtype=np.float64, count=len(results)
+        )
+        scores = self._calculate_ranking_scores(results, prices)
 
-        # Sort by ranking score (higher is better) then by price (lower is better)
-        ranked = sorted(results, key=lambda x: (-x.final_rank, x.normalized_price))
+        # Sort by ranking score (higher is better) then by price (lower is better);
+        # lexsort is stable, so full ties keep their input order
+        order = np.lexsort((prices, -scores))
+        ranked = [results[i] for i in order.tolist()]
 
         # Assign final rank positions
         for i, result in enumerate(ranked):
@@ -229,58 +348,54 @@ class ResultProcessor:
 
         return ranked
 
-    def _calculate_ranking_score(self, result: ProcessedResult, query: str) -> float:
-        """Calculate comprehensive ranking score."""
-        score = 0.0
-
-        # Similarity score (40% weight)
-        score += result.similarity_score * 0.4
-
-        # Source reliability (20% weight)
-        source_scores = {
-            'amazon': 0.9,
-            'apple': 0.95,
-            'bestbuy': 0.85,
-            'walmart': 0.8,
-            'target': 0.75,
-            'ebay': 0.7,
-            'default': 0.6
-        }
-        source_name = result.original_result.source.lower()
-        source_score = source_scores.get(source_name, source_scores['default'])
-        score += source_score * 0.2
-
-        # Availability bonus (15% weight)
-        if result.original_result.availability.lower() in ['in stock', 'available']:
-            score += 0.15
-        elif 'limited' in result.original_result.availability.lower():
-            score += 0.1
-
-        # Rating bonus (10% weight)
-        if result.original_result.rating:
-            rating_score = min(result.original_result.rating / 5.0, 1.0)
-            score += rating_score * 0.1
-
-        # Reviews count bonus (10% weight)
-        if result.original_result.reviews_count:
-            # Logarithmic scale for reviews
-            import math
-            reviews_score = min(math.log10(result.original_result.reviews_count + 1) / 4.0, 1.0)
-            score += reviews_score * 0.1
-
-        # Shipping cost penalty (5% weight)
-        if result.original_result.shipping_cost:
-            try:
-                shipping_price = price_parser.parse_price(result.original_result.shipping_cost)
-                if shipping_price and shipping_price.amount:
-                    if float(shipping_price.amount) == 0:
-                        score += 0.05  # Free shipping bonus
-                    else:
-                        # Penalty for expensive shipping
-                        shipping_ratio = float(shipping_price.amount) / result.normalized_price
-                        penalty = min(shipping_ratio * 0.05, 0.05)
-                        score -= penalty
-            except:
-                pass
-
-        return max(0.0, min(1.0, score))  # Clamp between 0 and 1
\ No newline at end of file
+    def _calculate_ranking_scores(self, results: List[ProcessedResult], prices: np.ndarray) -> np.ndarray:
+        """Calculate comprehensive ranking scores for all results at once."""
+        n = len(results)
+
+        # Gather one column per factor; only the lookups stay in Python
+        similarity = np.empty(n)
+        source = np.empty(n)
+        availability = np.zeros(n)
+        rating = np.zeros(n)
+        reviews = np.zeros(n)
+        shipping = np.full(n, np.nan)
+        for i, result in enumerate(results):
+            original = result.original_result
+            similarity[i] = result.similarity_score
+            source[i] = _SOURCE_SCORES.get(original.source.lower(), _DEFAULT_SOURCE_SCORE)
+
+            stock = original.availability.lower()
+            if stock in _IN_STOCK:
+                availability[i] = 0.15
+            elif 'limited' in stock:
+                availability[i] = 0.1
+
+            if original.rating:
+                rating[i] = original.rating
+            if original.reviews_count:
+                reviews[i] = original.reviews_count
+
+            if original.shipping_cost:
+                try:
+                    shipping_amount, _ = _parse_amount(original.shipping_cost)
+                    if shipping_amount:
+                        shipping[i] = shipping_amount
+                except Exception:
+                    pass
+
+        # Similarity (40%), source reliability (20%), availability (15%),
+        # rating (10%) and logarithmic review count (10%)
+        scores = similarity * 0.4
+        scores += source * 0.2
+        scores += availability
+        scores += np.minimum(rating / 5.0, 1.0) * 0.1
+        scores += np.minimum(np.log10(reviews + 1) / 4.0, 1.0) * 0.1
+
+        # Shipping cost (5%): bonus when free, otherwise a penalty relative to price
+        has_shipping = ~np.isnan(shipping)
+        free = has_shipping & (shipping == 0)
+        paid = has_shipping & ~free & (prices != 0)
+        scores[free] += 0.05
+        scores[paid] -= np.minimum(shipping[paid] / prices[paid] * 0.05, 0.05)
+
+        return np.clip(scores, 0.0, 1.0)
@@ -4,7 +4,7 @@ Provides intelligent product insights and query enhancement.
 """
 
 from .vector_store import VectorStore, Document
-from .knowledge_base import ProductKnowledgeBase, ProductKnowledge, PriceInsight
+from .knowledge_base import ProductKnowledgeBase, ProductKnowledge, PriceInsight, KnowledgeHit
 from .query_enhancer import QueryEnhancer, EnhancedQuery
 from .rag_engine import RAGEngine, RAGInsight
 
@@ -14,6 +14,7 @@ __all__ = [
     'ProductKnowledgeBase',
     'ProductKnowledge',
     'PriceInsight',
+    'KnowledgeHit',
     'QueryEnhancer',
     'EnhancedQuery',
     'RAGEngine',
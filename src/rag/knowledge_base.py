@@ -3,17 +3,65 @@ Knowledge base for product information and price insights.
 Manages product specifications, reviews, and historical data.
 """
 
-import json
-from typing import List, Dict, Any, Optional
-from dataclasses import dataclass, asdict
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import List, Dict, Any, NamedTuple, Optional, Tuple
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from pathlib import Path
+import numpy as np
+import orjson
 from loguru import logger
 
 from .vector_store import VectorStore, Document
 
 
-@dataclass
+# Starter product knowledge for an empty knowledge base
+SEED_KNOWLEDGE_PATH = Path(__file__).with_name("seed_knowledge.json")
+
+
+# Price trend labels by direction, as returned by price_trend_direction
+TREND_LABELS = {1: "increasing", -1: "decreasing", 0: "stable"}
+
+# Price points a trend is read from
+TREND_WINDOW = 3
+
+# Seconds a background save waits, so a burst of updates is written once
+SAVE_DEBOUNCE_SECONDS = 2.0
+
+
+def price_trend_direction(prices: np.ndarray, window: int = TREND_WINDOW) -> int:
+    """Compare the last price with the one `window` points back: 1 up, -1 down, 0 flat or too few."""
+    if len(prices) < window:
+        return 0
+    delta = prices[-1] - prices[-window]
+    return int(delta > 0) - int(delta < 0)
+
+
+def _write_atomic(path: Path, data: bytes):
+    """Write a file through a temporary sibling so a crash never leaves it half-written."""
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+
+def _flatten_specs(specs: Dict[str, Any]) -> str:
+    """Render a spec dict as plain "key: value" pairs for the embedding text."""
+    return "; ".join(f"{key}: {value}" for key, value in specs.items())
+
+
+class KnowledgeHit(NamedTuple):
+    """Knowledge base search result."""
+    content: str
+    metadata: Dict[str, Any]
+    relevance_score: float
+    document_id: str
+
+
+@dataclass(slots=True)
 class ProductKnowledge:
     """Product knowledge entry."""
     product_name: str
@@ -32,7 +80,7 @@ class ProductKnowledge:
             self.last_updated = datetime.now().isoformat()
 
 
-@dataclass
+@dataclass(slots=True)
 class PriceInsight:
     """Price insight entry."""
     product_name: str
@@ -47,23 +95,52 @@ class PriceInsight:
     def __post_init__(self):
         if not self.last_updated:
             self.last_updated = datetime.now().isoformat()
+    
+    def price_array(self, last: Optional[int] = None) -> np.ndarray:
+        """Historical prices as a float array, oldest first, optionally only the `last` few."""
+        points = self.historical_prices if last is None else self.historical_prices[-last:]
+        return np.fromiter((point["price"] for point in points), dtype=np.float64, count=len(points))
 
 
 class ProductKnowledgeBase:
     """Knowledge base for product information and insights."""
     
-    def __init__(self, data_path: str = "data/knowledge_base"):
-        """Initialize knowledge base."""
+    def __init__(self, data_path: str = "data/knowledge_base", index_type: str = "auto",
+                 quantize: bool = False, backend: str = "torch"):
+        """
+        Initialize knowledge base.
+        
+        Args:
+            data_path: Directory holding the knowledge files and vector index
+            index_type: Vector index for new stores, "auto", "flat" or "hnsw"
+            quantize: Keep the vectors of new stores as 8-bit codes
+            backend: Encoder runtime, "torch" or "onnx"
+        """
         self.data_path = Path(data_path)
         self.data_path.mkdir(parents=True, exist_ok=True)
         
         # Initialize vector store
-        self.vector_store = VectorStore(index_path=str(self.data_path / "vectors"))
+        self.vector_store = VectorStore(
+            index_path=str(self.data_path / "vectors"), index_type=index_type,
+            quantize=quantize, backend=backend
+        )
         
         # Load existing knowledge
         self.product_knowledge: Dict[str, ProductKnowledge] = {}
         self.price_insights: Dict[str, PriceInsight] = {}
         
+        # Repeated queries skip the embedding and index search; every change
+        # to the knowledge base clears the cache and bumps the version
+        self._version = 0
+        self._search_cached = lru_cache(maxsize=1024)(self._search_ids)
+        
+        # Background saves run one at a time on their own thread; a save
+        # requested while one is already waiting joins that one
+        self._save_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="knowledge-save")
+        self._save_lock = threading.Lock()
+        self._save_pending = False
+        self._pending_lock = threading.Lock()
+        
         self._load_knowledge_base()
         self._populate_initial_knowledge()
         
@@ -75,18 +152,16 @@ class ProductKnowledgeBase:
             # Load product knowledge
             products_path = self.data_path / "products.json"
             if products_path.exists():
-                with open(products_path, 'r') as f:
-                    products_data = json.load(f)
-                    for product_id, data in products_data.items():
-                        self.product_knowledge[product_id] = ProductKnowledge(**data)
+                products_data = orjson.loads(products_path.read_bytes())
+                for product_id, data in products_data.items():
+                    self.product_knowledge[product_id] = ProductKnowledge(**data)
             
             # Load price insights
             insights_path = self.data_path / "price_insights.json"
             if insights_path.exists():
-                with open(insights_path, 'r') as f:
-                    insights_data = json.load(f)
-                    for product_id, data in insights_data.items():
-                        self.price_insights[product_id] = PriceInsight(**data)
+                insights_data = orjson.loads(insights_path.read_bytes())
+                for product_id, data in insights_data.items():
+                    self.price_insights[product_id] = PriceInsight(**data)
                         
         except Exception as e:
             logger.warning(f"Could not load existing knowledge base: {e}")
@@ -98,158 +173,38 @@ class ProductKnowledgeBase:
         
         logger.info("Populating initial product knowledge...")
         
-        # iPhone knowledge
-        iphone_knowledge = [
-            {
-                "product_name": "iPhone 16 Pro",
-                "category": "smartphone",
-                "brand": "Apple",
-                "specifications": {
-                    "storage_options": ["128GB", "256GB", "512GB", "1TB"],
-                    "colors": ["Black Titanium", "White Titanium", "Natural Titanium", "Desert Titanium"],
-                    "display": "6.3-inch Super Retina XDR",
-                    "chip": "A18 Pro",
-                    "camera": "48MP Main, 48MP Ultra Wide, 12MP Telephoto",
-                    "battery": "Up to 27 hours video playback"
-                },
-                "features": [
-                    "Camera Control button",
-                    "Action Button",
-                    "Dynamic Island",
-                    "Face ID",
-                    "5G connectivity",
-                    "MagSafe compatible",
-                    "Water resistant IP68"
-                ],
-                "price_range": {"min": 999, "max": 1599, "avg": 1200},
-                "alternatives": ["iPhone 16", "iPhone 15 Pro", "Samsung Galaxy S24 Ultra", "Google Pixel 9 Pro"],
-                "reviews_summary": "Excellent camera system with new Camera Control. Great performance with A18 Pro chip. Premium build quality with titanium design.",
-                "market_insights": "High demand product. Prices typically stable for first 6 months, then gradual decrease. Best deals during Black Friday and carrier promotions."
-            },
-            {
-                "product_name": "iPhone 16",
-                "category": "smartphone", 
-                "brand": "Apple",
-                "specifications": {
-                    "storage_options": ["128GB", "256GB", "512GB"],
-                    "colors": ["Black", "White", "Pink", "Teal", "Ultramarine"],
-                    "display": "6.1-inch Super Retina XDR",
-                    "chip": "A18",
-                    "camera": "48MP Main, 12MP Ultra Wide",
-                    "battery": "Up to 22 hours video playback"
-                },
-                "features": [
-                    "Camera Control button",
-                    "Action Button", 
-                    "Dynamic Island",
-                    "Face ID",
-                    "5G connectivity",
-                    "MagSafe compatible"
-                ],
-                "price_range": {"min": 799, "max": 1099, "avg": 900},
-                "alternatives": ["iPhone 15", "iPhone 16 Plus", "Samsung Galaxy S24", "Google Pixel 9"],
-                "reviews_summary": "Great value iPhone with new Camera Control. Solid performance with A18 chip. Good camera system for the price.",
-                "market_insights": "Popular mid-range option. More price flexibility than Pro models. Good trade-in values."
-            }
-        ]
+        # Seed entries ship as a data file, read only when the base is empty
+        all_knowledge = orjson.loads(SEED_KNOWLEDGE_PATH.read_bytes())
         
-        # Android knowledge
-        android_knowledge = [
-            {
-                "product_name": "Samsung Galaxy S24 Ultra",
-                "category": "smartphone",
-                "brand": "Samsung", 
-                "specifications": {
-                    "storage_options": ["256GB", "512GB", "1TB"],
-                    "colors": ["Titanium Black", "Titanium Gray", "Titanium Violet", "Titanium Yellow"],
-                    "display": "6.8-inch Dynamic AMOLED 2X",
-                    "chip": "Snapdragon 8 Gen 3",
-                    "camera": "200MP Main, 50MP Periscope, 10MP Telephoto, 12MP Ultra Wide",
-                    "battery": "5000mAh"
-                },
-                "features": [
-                    "S Pen included",
-                    "AI photo editing",
-                    "100x Space Zoom",
-                    "IP68 water resistance",
-                    "Wireless charging",
-                    "Samsung DeX"
-                ],
-                "price_range": {"min": 1199, "max": 1659, "avg": 1400},
-                "alternatives": ["iPhone 16 Pro Max", "Google Pixel 9 Pro XL", "OnePlus 12"],
-                "reviews_summary": "Excellent camera zoom capabilities. Great for productivity with S Pen. Premium build and display quality.",
-                "market_insights": "Samsung phones depreciate faster than iPhones. Best deals 3-6 months after launch. Strong trade-in programs."
-            },
-            {
-                "product_name": "OnePlus 12",
-                "category": "smartphone",
-                "brand": "OnePlus",
-                "specifications": {
-                    "storage_options": ["256GB", "512GB"],
-                    "colors": ["Silky Black", "Flowy Emerald"],
-                    "display": "6.82-inch LTPO AMOLED",
-                    "chip": "Snapdragon 8 Gen 3",
-                    "camera": "50MP Main, 64MP Periscope, 48MP Ultra Wide",
-                    "battery": "5400mAh"
-                },
-                "features": [
-                    "100W fast charging",
-                    "50W wireless charging",
-                    "Alert Slider",
-                    "IP65 water resistance",
-                    "OxygenOS",
-                    "Gaming mode"
-                ],
-                "price_range": {"min": 699, "max": 899, "avg": 799},
-                "alternatives": ["Samsung Galaxy S24", "iPhone 16", "Google Pixel 9"],
-                "reviews_summary": "Excellent value flagship. Very fast charging. Clean software experience. Good camera performance.",
-                "market_insights": "Great price-to-performance ratio. Limited availability in some markets. Prices drop quickly after 6 months."
-            }
-        ]
-        
-        # Laptop knowledge
-        laptop_knowledge = [
-            {
-                "product_name": "MacBook Air M2",
-                "category": "laptop",
-                "brand": "Apple",
-                "specifications": {
-                    "storage_options": ["256GB", "512GB", "1TB", "2TB"],
-                    "memory_options": ["8GB", "16GB", "24GB"],
-                    "colors": ["Space Gray", "Silver", "Starlight", "Midnight"],
-                    "display": "13.6-inch Liquid Retina",
-                    "chip": "Apple M2",
-                    "battery": "Up to 18 hours"
-                },
-                "features": [
-                    "Fanless design",
-                    "MagSafe charging",
-                    "Touch ID",
-                    "1080p FaceTime HD camera",
-                    "Four-speaker sound system",
-                    "macOS"
-                ],
-                "price_range": {"min": 999, "max": 2499, "avg": 1400},
-                "alternatives": ["MacBook Pro 14-inch", "Dell XPS 13", "Surface Laptop 5"],
-                "reviews_summary": "Excellent battery life and performance. Great for everyday tasks. Silent operation. Premium build quality.",
-                "market_insights": "Strong resale value. Educational discounts available. Best deals during back-to-school season."
-            }
-        ]
-        
-        # Add all knowledge to the system
-        all_knowledge = iphone_knowledge + android_knowledge + laptop_knowledge
-        
-        for knowledge in all_knowledge:
-            self.add_product_knowledge(ProductKnowledge(**knowledge))
+        self.add_product_knowledge_batch([ProductKnowledge(**knowledge) for knowledge in all_knowledge])
         
         logger.info(f"Added {len(all_knowledge)} initial product knowledge entries")
     
     def add_product_knowledge(self, knowledge: ProductKnowledge) -> str:
         """Add product knowledge to the knowledge base."""
-        product_id = f"{knowledge.brand}_{knowledge.product_name}".replace(" ", "_").lower()
+        return self.add_product_knowledge_batch([knowledge])[0]
+    
+    def add_product_knowledge_batch(self, knowledge_list: List[ProductKnowledge]) -> List[str]:
+        """Add several products, embedding and indexing them in one batch."""
+        product_ids = []
+        documents = []
+        for knowledge in knowledge_list:
+            product_id, content, metadata = self._product_document(knowledge)
+            
+            # Store in memory
+            self.product_knowledge[product_id] = knowledge
+            product_ids.append(product_id)
+            documents.append((content, metadata))
+        self.cache_clear()
         
-        # Store in memory
-        self.product_knowledge[product_id] = knowledge
+        # Add to vector store
+        self.vector_store.add_documents(documents)
+        
+        return product_ids
+    
+    def _product_document(self, knowledge: ProductKnowledge) -> Tuple[str, str, Dict[str, Any]]:
+        """Build the product ID and the vector store content and metadata."""
+        product_id = f"{knowledge.brand}_{knowledge.product_name}".replace(" ", "_").lower()
         
         # Create searchable content for vector store
         content = f"""
@@ -257,7 +212,7 @@ class ProductKnowledgeBase:
         Brand: {knowledge.brand}
         Category: {knowledge.category}
         
-        Specifications: {json.dumps(knowledge.specifications, indent=2)}
+        Specifications: {_flatten_specs(knowledge.specifications)}
         
         Features: {', '.join(knowledge.features)}
         
@@ -279,10 +234,7 @@ class ProductKnowledgeBase:
             "price_max": knowledge.price_range['max']
         }
         
-        # Add to vector store
-        self.vector_store.add_document(content, metadata)
-        
-        return product_id
+        return product_id, content, metadata
     
     def add_price_insight(self, insight: PriceInsight) -> str:
         """Add price insight to the knowledge base."""
@@ -290,6 +242,7 @@ class ProductKnowledgeBase:
         
         # Store in memory
         self.price_insights[product_id] = insight
+        self.cache_clear()
         
         # Create searchable content for vector store
         content = f"""
@@ -298,7 +251,7 @@ class ProductKnowledgeBase:
         Price Trend: {insight.price_trend}
         Best Time to Buy: {insight.best_time_to_buy}
         
-        Historical Prices: {json.dumps(insight.historical_prices, indent=2)}
+        Historical Prices: {orjson.dumps(insight.historical_prices).decode()}
         
         Market Analysis: {insight.market_analysis}
         
@@ -317,29 +270,50 @@ class ProductKnowledgeBase:
         
         return product_id
     
-    def search_knowledge(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
-        """Search knowledge base for relevant information."""
-        results = self.vector_store.search(query, top_k=top_k)
-        
+    @property
+    def version(self) -> int:
+        """Counter bumped on every change, for callers that cache derived results."""
+        return self._version
+    
+    def cache_clear(self):
+        """Invalidate cached search results after the knowledge base changes."""
+        self._version += 1
+        self._search_cached.cache_clear()
+    
+    def _search_ids(self, query: str, top_k: int,
+                    filter_type: Optional[str]) -> Tuple[Tuple[str, float], ...]:
+        """Run a vector search, keeping only document IDs and scores."""
+        results = self.vector_store.search(query, top_k=top_k, filter_type=filter_type)
+        return tuple((doc.id, score) for doc, score in results)
+    
+    def search_knowledge(self, query: str, top_k: int = 5,
+                         filter_type: Optional[str] = None) -> List[KnowledgeHit]:
+        """Search knowledge base for relevant information, optionally of one document type."""
         formatted_results = []
-        for doc, score in results:
-            result = {
-                "content": doc.content,
-                "metadata": doc.metadata,
-                "relevance_score": score,
-                "document_id": doc.id
-            }
-            formatted_results.append(result)
+        for doc_id, score in self._search_cached(query, top_k, filter_type):
+            doc = self.vector_store.get_document(doc_id)
+            if doc is None:
+                continue
+            formatted_results.append(KnowledgeHit(doc.content, doc.metadata, score, doc.id))
         
         return formatted_results
     
+    def search_knowledge_batch(self, queries: List[str], top_k: int = 1,
+                               filter_type: Optional[str] = None) -> List[List[KnowledgeHit]]:
+        """Search for several queries in one encoder pass and one index lookup."""
+        results = self.vector_store.search_batch(queries, top_k=top_k, filter_type=filter_type)
+        return [
+            [KnowledgeHit(doc.content, doc.metadata, score, doc.id) for doc, score in hits]
+            for hits in results
+        ]
+    
     def get_product_alternatives(self, product_name: str) -> List[str]:
         """Get alternative products for a given product."""
         # Search for the product in knowledge base
-        results = self.search_knowledge(product_name, top_k=1)
+        results = self.search_knowledge(product_name, top_k=1, filter_type="product_knowledge")
         
-        if results and results[0]["metadata"].get("type") == "product_knowledge":
-            product_id = results[0]["metadata"]["product_id"]
+        if results:
+            product_id = results[0].metadata["product_id"]
             if product_id in self.product_knowledge:
                 return self.product_knowledge[product_id].alternatives
         
@@ -350,32 +324,55 @@ class ProductKnowledgeBase:
         product_id = product_name.replace(" ", "_").lower()
         return self.price_insights.get(product_id)
     
-    def save_knowledge_base(self):
-        """Save knowledge base to disk."""
-        try:
-            # Save product knowledge
-            products_data = {}
-            for product_id, knowledge in self.product_knowledge.items():
-                products_data[product_id] = asdict(knowledge)
-            
-            with open(self.data_path / "products.json", 'w') as f:
-                json.dump(products_data, f, indent=2)
-            
-            # Save price insights
-            insights_data = {}
-            for product_id, insight in self.price_insights.items():
-                insights_data[product_id] = asdict(insight)
-            
-            with open(self.data_path / "price_insights.json", 'w') as f:
-                json.dump(insights_data, f, indent=2)
-            
-            # Save vector store
-            self.vector_store.save_index()
-            
-            logger.info("Knowledge base saved successfully")
-            
-        except Exception as e:
-            logger.error(f"Error saving knowledge base: {e}")
+    def save_knowledge_base(self, async_: bool = False):
+        """
+        Save knowledge base to disk.
+        
+        Args:
+            async_: Write on a background thread after a short delay instead
+                of before returning; saves requested meanwhile are coalesced
+        """
+        if not async_:
+            self._save()
+            return
+        
+        with self._pending_lock:
+            if self._save_pending:
+                return
+            self._save_pending = True
+        self._save_executor.submit(self._save_debounced)
+    
+    def flush(self):
+        """Wait until any background save has been written."""
+        self._save_executor.submit(lambda: None).result()
+    
+    def _save_debounced(self):
+        """Background save, delayed to take in the updates that follow."""
+        time.sleep(SAVE_DEBOUNCE_SECONDS)
+        # Cleared before writing, so a change made during the save
+        # schedules another
+        with self._pending_lock:
+            self._save_pending = False
+        self._save()
+    
+    def _save(self):
+        """Write the knowledge files and the vector store."""
+        # Saves from the caller and the background thread never overlap
+        with self._save_lock:
+            try:
+                # orjson serializes the dataclasses directly, without an asdict()
+                # copy; the files are only read back by this class, so they are
+                # written compact rather than indented
+                _write_atomic(self.data_path / "products.json", orjson.dumps(self.product_knowledge))
+                _write_atomic(self.data_path / "price_insights.json", orjson.dumps(self.price_insights))
+                
+                # Save vector store
+                self.vector_store.save_index()
+                
+                logger.info("Knowledge base saved successfully")
+                
+            except Exception as e:
+                logger.error(f"Error saving knowledge base: {e}")
     
     def get_stats(self) -> Dict[str, Any]:
         """Get knowledge base statistics."""
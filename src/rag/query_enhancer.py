@@ -4,14 +4,69 @@ Enhances user queries with product knowledge and context.
 """
 
 import re
+from functools import lru_cache
 from typing import List, Dict, Any, Optional, Tuple
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from loguru import logger
 
-from .knowledge_base import ProductKnowledgeBase
+from .knowledge_base import ProductKnowledgeBase, ProductKnowledge, KnowledgeHit
 
 
-@dataclass
+# Spelled-out storage units and their short forms
+_STORAGE_UNITS = {'gigabyte': 'gb', 'terabyte': 'tb'}
+
+# Knowledge hits fetched per query; enhancement and context share the search
+# and only ever use the best hit
+_KNOWLEDGE_TOP_K = 1
+
+# Relevance a knowledge match needs before it is used to enhance a query
+_MIN_ENHANCE_CONFIDENCE = 0.5
+
+# Country-specific terms appended to enhanced queries, as (trigger pattern,
+# suffix) pairs tried in order; the first pair whose triggers occur anywhere
+# in the lowercased query wins
+_COUNTRY_TERMS = {
+    # India-specific terms for better local results
+    'IN': (
+        (re.compile('iphone|apple'), " India official"),
+        (re.compile('samsung|oneplus'), " India variant"),
+    ),
+}
+
+# Words marking a phone search, which should name a storage size
+_PHONE_TERMS_RE = re.compile('phone|iphone|galaxy|pixel')
+
+
+class _PatternSet:
+    """Alternative patterns fused into a single regex; earlier patterns win."""
+    
+    def __init__(self, patterns: Tuple[str, ...]):
+        self.regex = re.compile('|'.join(f'({pattern})' for pattern in patterns))
+        
+        # Each alternative is wrapped in an outer group; map that group's
+        # number to the alternative's priority and its inner groups
+        self._alternatives: Dict[int, Tuple[int, range]] = {}
+        group = 1
+        for priority, pattern in enumerate(patterns):
+            inner = re.compile(pattern).groups
+            self._alternatives[group] = (priority, range(group + 1, group + 1 + inner))
+            group += inner + 1
+    
+    def first(self, text: str) -> Optional[Tuple[str, ...]]:
+        """Return the groups of the first match of the highest-priority pattern that matches."""
+        best = None
+        best_priority = len(self._alternatives)
+        for match in self.regex.finditer(text):
+            priority, inner = self._alternatives[match.lastindex]
+            if priority < best_priority:
+                best = tuple(match.group(i) for i in inner) or (match.group(),)
+                best_priority = priority
+                if priority == 0:
+                    break
+        return best
+
+
+@dataclass(slots=True)
 class EnhancedQuery:
     """Enhanced query with additional context."""
     original_query: str
@@ -29,86 +84,94 @@ class QueryEnhancer:
         """Initialize query enhancer."""
         self.knowledge_base = knowledge_base
         
-        # Product feature patterns
-        self.storage_patterns = [
+        # Product feature patterns. Within each list, earlier patterns take
+        # precedence over later ones wherever they occur in the query
+        self.storage_patterns = (
             r'(\d+)\s*(gb|tb)',
-            r'(\d+)\s*gigabyte',
-            r'(\d+)\s*terabyte'
-        ]
+            r'(\d+)\s*(gigabyte)',
+            r'(\d+)\s*(terabyte)'
+        )
         
-        self.memory_patterns = [
+        self.memory_patterns = (
             r'(\d+)\s*gb\s*(ram|memory)',
             r'(\d+)\s*gb\s*ram',
             r'(\d+)\s*gigabyte\s*(ram|memory)'
-        ]
+        )
         
-        self.color_patterns = [
-            r'\b(black|white|silver|gold|rose\s*gold|space\s*gray|midnight|starlight|blue|red|green|purple|pink|yellow|orange)\b'
-        ]
+        self.color_patterns = (
+            r'\b(black|white|silver|gold|rose\s*gold|space\s*gray|midnight|starlight|blue|red|green|purple|pink|yellow|orange)\b',
+        )
         
-        self.brand_patterns = [
+        # Phone brands take precedence over laptop brands
+        self.brand_patterns = (
             r'\b(apple|samsung|google|oneplus|xiaomi|huawei|sony|lg|motorola|nokia|oppo|vivo|realme)\b',
             r'\b(dell|hp|lenovo|asus|acer|msi|razer|alienware|surface|macbook)\b'
-        ]
+        )
+        
+        self.model_patterns = (
+            r'\b(iphone\s*\d+(?:\s*pro)?(?:\s*max)?)\b',
+            r'\b(galaxy\s*s\d+(?:\s*ultra)?(?:\s*plus)?)\b',
+            r'\b(pixel\s*\d+(?:\s*pro)?(?:\s*xl)?)\b',
+            r'\b(oneplus\s*\d+(?:\s*pro)?)\b',
+            r'\b(macbook\s*(?:air|pro)?(?:\s*m\d+)?)\b'
+        )
+        
+        # Each feature's patterns are fused into one regex that is scanned
+        # once. Queries are lowercased first, so no IGNORECASE is needed
+        self._storage_re = _PatternSet(self.storage_patterns)
+        self._memory_re = _PatternSet(self.memory_patterns)
+        self._color_re = _PatternSet(self.color_patterns)
+        self._brand_re = _PatternSet(self.brand_patterns)
+        self._model_re = _PatternSet(self.model_patterns)
+        
+        # Queries repeat a lot; enhancements are also keyed by the knowledge
+        # base version so they are recomputed once it changes
+        self._features_cached = lru_cache(maxsize=1024)(self._extract_features)
+        self._enhance_cached = lru_cache(maxsize=1024)(self._enhance_query)
         
         logger.info("Query enhancer initialized")
     
     def extract_features(self, query: str) -> Dict[str, Any]:
         """Extract product features from query."""
-        query_lower = query.lower()
+        return dict(self._features_cached(query.lower()))
+    
+    def _extract_features(self, query_lower: str) -> Dict[str, Any]:
+        """Extract product features from a lowercased query."""
         features = {}
         
         # Extract storage
-        for pattern in self.storage_patterns:
-            matches = re.findall(pattern, query_lower, re.IGNORECASE)
-            if matches:
-                storage_value, unit = matches[0]
-                if unit.lower() == 'tb':
-                    storage_gb = int(storage_value) * 1024
-                else:
-                    storage_gb = int(storage_value)
-                features['storage'] = f"{storage_value}{unit.upper()}"
-                features['storage_gb'] = storage_gb
-                break
+        match = self._storage_re.first(query_lower)
+        if match:
+            storage_value, unit = match
+            unit = _STORAGE_UNITS.get(unit, unit)
+            if unit == 'tb':
+                storage_gb = int(storage_value) * 1024
+            else:
+                storage_gb = int(storage_value)
+            features['storage'] = f"{storage_value}{unit.upper()}"
+            features['storage_gb'] = storage_gb
         
         # Extract memory/RAM
-        for pattern in self.memory_patterns:
-            matches = re.findall(pattern, query_lower, re.IGNORECASE)
-            if matches:
-                if len(matches[0]) == 2:
-                    memory_value, _ = matches[0]
-                else:
-                    memory_value = matches[0]
-                features['memory'] = f"{memory_value}GB"
-                features['memory_gb'] = int(memory_value)
-                break
+        match = self._memory_re.first(query_lower)
+        if match:
+            memory_value = match[0]
+            features['memory'] = f"{memory_value}GB"
+            features['memory_gb'] = int(memory_value)
         
         # Extract colors
-        color_matches = re.findall(self.color_patterns[0], query_lower, re.IGNORECASE)
-        if color_matches:
-            features['color'] = color_matches[0].title()
+        match = self._color_re.first(query_lower)
+        if match:
+            features['color'] = match[0].title()
         
         # Extract brands
-        for pattern in self.brand_patterns:
-            brand_matches = re.findall(pattern, query_lower, re.IGNORECASE)
-            if brand_matches:
-                features['brand'] = brand_matches[0].title()
-                break
+        match = self._brand_re.first(query_lower)
+        if match:
+            features['brand'] = match[0].title()
         
         # Extract model numbers/names
-        model_patterns = [
-            r'\b(iphone\s*\d+(?:\s*pro)?(?:\s*max)?)\b',
-            r'\b(galaxy\s*s\d+(?:\s*ultra)?(?:\s*plus)?)\b',
-            r'\b(pixel\s*\d+(?:\s*pro)?(?:\s*xl)?)\b',
-            r'\b(oneplus\s*\d+(?:\s*pro)?)\b',
-            r'\b(macbook\s*(?:air|pro)?(?:\s*m\d+)?)\b'
-        ]
-        
-        for pattern in model_patterns:
-            matches = re.findall(pattern, query_lower, re.IGNORECASE)
-            if matches:
-                features['model'] = matches[0].title()
-                break
+        match = self._model_re.first(query_lower)
+        if match:
+            features['model'] = match[0].title()
         
         return features
     
@@ -123,75 +186,74 @@ class QueryEnhancer:
         Returns:
             Enhanced query with additional context
         """
+        cached = self._enhance_cached(query, country, self.knowledge_base.version)
+        
+        # Hand out fresh containers so callers can't alter the cached entry
+        return replace(
+            cached,
+            extracted_features=dict(cached.extracted_features),
+            suggested_alternatives=list(cached.suggested_alternatives),
+            price_context=dict(cached.price_context) if cached.price_context is not None else None
+        )
+    
+    def _enhance_query(self, query: str, country: str, kb_version: int) -> EnhancedQuery:
+        """Enhance a query against the given knowledge base version."""
         logger.info(f"Enhancing query: '{query}' for country: {country}")
+        query_lower = query.lower()
         
         # Extract features from original query
-        extracted_features = self.extract_features(query)
+        extracted_features = dict(self._features_cached(query_lower))
         
         # Search knowledge base for relevant products
-        knowledge_results = self.knowledge_base.search_knowledge(query, top_k=3)
+        knowledge_results = self.knowledge_base.search_knowledge(query, top_k=_KNOWLEDGE_TOP_K)
         
         # Build enhanced query
         enhanced_parts = [query]
         suggested_alternatives = []
         price_context = None
-        confidence_score = 0.0
+        confidence_score = knowledge_results[0].relevance_score if knowledge_results else 0.0
         
-        if knowledge_results:
-            best_match = knowledge_results[0]
-            confidence_score = best_match["relevance_score"]
+        # Only a good match is looked up in the product knowledge
+        product = self._matched_product(knowledge_results[0]) if confidence_score > _MIN_ENHANCE_CONFIDENCE else None
+        if product is not None:
+            # Add missing specifications to query
+            if 'storage' not in extracted_features and product.specifications.get('storage_options'):
+                # Add most common storage option
+                common_storage = product.specifications['storage_options'][0]
+                enhanced_parts.append(common_storage)
+                extracted_features['storage'] = common_storage
+            
+            # Add brand if missing
+            if 'brand' not in extracted_features:
+                enhanced_parts.append(product.brand)
+                extracted_features['brand'] = product.brand
+            
+            # Get alternatives
+            suggested_alternatives = product.alternatives[:3]
             
-            # If we have a good match, enhance the query
-            if confidence_score > 0.5:
-                metadata = best_match["metadata"]
-                
-                if metadata.get("type") == "product_knowledge":
-                    product_id = metadata["product_id"]
-                    
-                    # Get product knowledge
-                    if product_id in self.knowledge_base.product_knowledge:
-                        product = self.knowledge_base.product_knowledge[product_id]
-                        
-                        # Add missing specifications to query
-                        if 'storage' not in extracted_features and product.specifications.get('storage_options'):
-                            # Add most common storage option
-                            common_storage = product.specifications['storage_options'][0]
-                            enhanced_parts.append(common_storage)
-                            extracted_features['storage'] = common_storage
-                        
-                        # Add brand if missing
-                        if 'brand' not in extracted_features:
-                            enhanced_parts.append(product.brand)
-                            extracted_features['brand'] = product.brand
-                        
-                        # Get alternatives
-                        suggested_alternatives = product.alternatives[:3]
-                        
-                        # Get price context
-                        price_context = {
-                            "expected_range": product.price_range,
-                            "market_insights": product.market_insights
-                        }
-                        
-                        # Get price insights if available
-                        price_insight = self.knowledge_base.get_price_insights(product.product_name)
-                        if price_insight:
-                            price_context.update({
-                                "current_price": price_insight.current_price,
-                                "trend": price_insight.price_trend,
-                                "best_time_to_buy": price_insight.best_time_to_buy
-                            })
+            # Get price context
+            price_context = {
+                "expected_range": product.price_range,
+                "market_insights": product.market_insights
+            }
+            
+            # Get price insights if available
+            price_insight = self.knowledge_base.get_price_insights(product.product_name)
+            if price_insight:
+                price_context.update({
+                    "current_price": price_insight.current_price,
+                    "trend": price_insight.price_trend,
+                    "best_time_to_buy": price_insight.best_time_to_buy
+                })
         
         # Build final enhanced query
         enhanced_query = " ".join(enhanced_parts)
         
         # Add country-specific enhancements
-        if country == "IN":
-            # Add India-specific terms for better local results
-            if any(brand in query.lower() for brand in ['iphone', 'apple']):
-                enhanced_query += " India official"
-            elif any(brand in query.lower() for brand in ['samsung', 'oneplus']):
-                enhanced_query += " India variant"
+        for triggers, suffix in _COUNTRY_TERMS.get(country, ()):
+            if triggers.search(query_lower):
+                enhanced_query += suffix
+                break
         
         result = EnhancedQuery(
             original_query=query,
@@ -206,8 +268,39 @@ class QueryEnhancer:
         
         return result
     
+    def _matched_product(self, hit: KnowledgeHit) -> Optional[ProductKnowledge]:
+        """Return the product knowledge a search hit refers to, if it is a product entry."""
+        if hit.metadata.get("type") != "product_knowledge":
+            return None
+        return self.knowledge_base.product_knowledge.get(hit.metadata["product_id"])
+    
+    def analyze(self, query: str, country: str = "US") -> Tuple[EnhancedQuery, Dict[str, Any]]:
+        """
+        Enhance a query and build its context in one pass.
+        
+        Features are extracted and the knowledge base is searched once, and
+        both results are derived from them.
+        
+        Args:
+            query: Original search query
+            country: Target country for search
+            
+        Returns:
+            The enhanced query and the query context
+        """
+        features = self.extract_features(query)
+        knowledge_results = self.knowledge_base.search_knowledge(query, top_k=_KNOWLEDGE_TOP_K)
+        
+        # Enhancement repeats the same search, which the knowledge base cache answers
+        enhanced = self.enhance_query(query, country)
+        return enhanced, self._build_context(query, features, knowledge_results)
+    
     def suggest_query_improvements(self, query: str) -> List[str]:
         """Suggest improvements to the search query."""
+        return self._suggest_improvements(query, self.extract_features(query))
+    
+    def _suggest_improvements(self, query: str, features: Dict[str, Any]) -> List[str]:
+        """Suggest improvements given the query's extracted features."""
         suggestions = []
         
         # Check if query is too vague
@@ -215,12 +308,11 @@ class QueryEnhancer:
             suggestions.append("Try adding more specific details like storage size, color, or model")
         
         # Check for missing brand
-        features = self.extract_features(query)
         if 'brand' not in features:
             suggestions.append("Consider specifying a brand (Apple, Samsung, Google, etc.)")
         
         # Check for missing storage
-        if 'storage' not in features and any(term in query.lower() for term in ['phone', 'iphone', 'galaxy', 'pixel']):
+        if 'storage' not in features and _PHONE_TERMS_RE.search(query.lower()):
             suggestions.append("Add storage capacity (128GB, 256GB, etc.) for better results")
         
         # Check for missing model
@@ -232,17 +324,21 @@ class QueryEnhancer:
     def get_query_context(self, query: str) -> Dict[str, Any]:
         """Get additional context for a query."""
         features = self.extract_features(query)
-        knowledge_results = self.knowledge_base.search_knowledge(query, top_k=1)
-        
+        knowledge_results = self.knowledge_base.search_knowledge(query, top_k=_KNOWLEDGE_TOP_K)
+        return self._build_context(query, features, knowledge_results)
+    
+    def _build_context(self, query: str, features: Dict[str, Any],
+                       knowledge_results: List[KnowledgeHit]) -> Dict[str, Any]:
+        """Assemble the query context from extracted features and knowledge hits."""
         context = {
             "extracted_features": features,
             "feature_count": len(features),
             "has_knowledge_match": len(knowledge_results) > 0,
-            "suggestions": self.suggest_query_improvements(query)
+            "suggestions": self._suggest_improvements(query, features)
         }
         
         if knowledge_results:
-            context["knowledge_confidence"] = knowledge_results[0]["relevance_score"]
-            context["matched_product"] = knowledge_results[0]["metadata"]
+            context["knowledge_confidence"] = knowledge_results[0].relevance_score
+            context["matched_product"] = knowledge_results[0].metadata
         
         return context
@@ -3,15 +3,41 @@ RAG (Retrieval-Augmented Generation) engine for PriceHunter.
 Combines product knowledge with search results for intelligent insights.
 """
 
-from typing import List, Dict, Any, Optional
-from dataclasses import dataclass, asdict
+from typing import List, Dict, Any, NamedTuple, Optional, Tuple
+from dataclasses import dataclass
 from datetime import datetime
+import numpy as np
 from loguru import logger
 
-from .knowledge_base import ProductKnowledgeBase, ProductKnowledge, PriceInsight
+from .knowledge_base import (
+    ProductKnowledgeBase, ProductKnowledge, PriceInsight,
+    TREND_LABELS, TREND_WINDOW, price_trend_direction
+)
 from .query_enhancer import QueryEnhancer, EnhancedQuery
 
 
+# Price points kept per product insight
+MAX_PRICE_HISTORY = 30
+
+
+class _ParsedResults(NamedTuple):
+    """Prices and ratings of search results parsed to floats, None where missing."""
+    prices: List[Optional[float]]
+    ratings: List[Optional[float]]
+
+
+def _parse_results(results: List[Dict[str, Any]]) -> _ParsedResults:
+    """Parse every result's price and rating once, for all the insight generators."""
+    prices = []
+    ratings = []
+    for result in results:
+        price = result.get('price')
+        rating = result.get('rating')
+        prices.append(float(price) if price else None)
+        ratings.append(float(rating) if rating else None)
+    return _ParsedResults(prices, ratings)
+
+
 @dataclass
 class RAGInsight:
     """RAG-generated insight about search results."""
@@ -60,13 +86,17 @@ class RAGEngine:
         if not results:
             return insights
         
+        # Prices and ratings are parsed here once rather than by each
+        # generator; the ones that use them need at least two results
+        parsed = _parse_results(results) if len(results) > 1 else None
+        
         # Price analysis insight
-        price_insight = self._generate_price_analysis(query, results, enhanced_query)
+        price_insight = self._generate_price_analysis(query, results, enhanced_query, parsed)
         if price_insight:
             insights.append(price_insight)
         
         # Product comparison insight
-        comparison_insight = self._generate_product_comparison(query, results, enhanced_query)
+        comparison_insight = self._generate_product_comparison(query, results, enhanced_query, parsed)
         if comparison_insight:
             insights.append(comparison_insight)
         
@@ -83,18 +113,25 @@ class RAGEngine:
         return insights
     
     def _generate_price_analysis(self, query: str, results: List[Dict[str, Any]], 
-                                enhanced_query: Optional[EnhancedQuery] = None) -> Optional[RAGInsight]:
+                                enhanced_query: Optional[EnhancedQuery] = None,
+                                parsed: Optional[_ParsedResults] = None) -> Optional[RAGInsight]:
         """Generate price analysis insight."""
         if len(results) < 2:
             return None
         
-        prices = [float(r['price']) for r in results if r.get('price')]
-        if not prices:
+        # The priced results line up with the array
+        if parsed is None:
+            parsed = _parse_results(results)
+        priced = [r for r, price in zip(results, parsed.prices) if price is not None]
+        if not priced:
             return None
+        prices = np.fromiter((price for price in parsed.prices if price is not None),
+                             dtype=np.float64, count=len(priced))
         
-        min_price = min(prices)
-        max_price = max(prices)
-        avg_price = sum(prices) / len(prices)
+        best_index = int(prices.argmin())
+        min_price = float(prices[best_index])
+        max_price = float(prices.max())
+        avg_price = float(prices.mean())
         price_variance = max_price - min_price
         
         # Get expected price range from knowledge base
@@ -121,7 +158,7 @@ class RAGEngine:
                 content_parts.append(f"💸 Prices seem high. Lowest price (${min_price:.0f}) is above expected range (${expected_min}-${expected_max})")
         
         # Best value recommendation
-        best_value = min(results, key=lambda x: float(x.get('price', float('inf'))))
+        best_value = priced[best_index]
         content_parts.append(f"🏆 Best price: ${best_value['price']} from {best_value['seller']}")
         
         return RAGInsight(
@@ -143,39 +180,57 @@ class RAGEngine:
         )
     
     def _generate_product_comparison(self, query: str, results: List[Dict[str, Any]], 
-                                   enhanced_query: Optional[EnhancedQuery] = None) -> Optional[RAGInsight]:
+                                   enhanced_query: Optional[EnhancedQuery] = None,
+                                   parsed: Optional[_ParsedResults] = None) -> Optional[RAGInsight]:
         """Generate product comparison insight."""
         if len(results) < 2:
             return None
-        
-        # Group by seller
-        sellers = {}
-        for result in results:
+        if parsed is None:
+            parsed = _parse_results(results)
+        
+        # Group by seller, tracking each seller's price range and the rating
+        # stats in the same pass
+        sellers: Dict[str, List[Dict[str, Any]]] = {}
+        price_ranges: Dict[str, Tuple[float, float]] = {}
+        rating_sum = 0.0
+        rating_count = 0
+        best_rated = None
+        best_rating = 0.0
+        for result, price, rating in zip(results, parsed.prices, parsed.ratings):
             seller = result.get('seller', 'Unknown')
-            if seller not in sellers:
-                sellers[seller] = []
-            sellers[seller].append(result)
+            seller_results = sellers.get(seller)
+            if seller_results is None:
+                seller_results = sellers[seller] = []
+            seller_results.append(result)
+            
+            if price is not None:
+                price_range = price_ranges.get(seller)
+                if price_range is None:
+                    price_ranges[seller] = (price, price)
+                else:
+                    price_ranges[seller] = (min(price_range[0], price), max(price_range[1], price))
+            
+            if rating is not None:
+                rating_sum += rating
+                rating_count += 1
+                if best_rated is None or rating > best_rating:
+                    best_rated, best_rating = result, rating
         
         content_parts = [f"Found products from {len(sellers)} different sellers:"]
         
         # Analyze by seller
         for seller, seller_results in sellers.items():
             if len(seller_results) > 1:
-                prices = [float(r['price']) for r in seller_results if r.get('price')]
-                if prices:
-                    min_price = min(prices)
-                    max_price = max(prices)
-                    content_parts.append(f"📱 {seller}: {len(seller_results)} options (${min_price:.0f} - ${max_price:.0f})")
+                price_range = price_ranges.get(seller)
+                if price_range:
+                    content_parts.append(f"📱 {seller}: {len(seller_results)} options (${price_range[0]:.0f} - ${price_range[1]:.0f})")
             else:
                 result = seller_results[0]
                 content_parts.append(f"📱 {seller}: ${result.get('price', 'N/A')}")
         
         # Rating analysis
-        rated_results = [r for r in results if r.get('rating')]
-        if rated_results:
-            avg_rating = sum(float(r['rating']) for r in rated_results) / len(rated_results)
-            best_rated = max(rated_results, key=lambda x: float(x.get('rating', 0)))
-            content_parts.append(f"⭐ Average rating: {avg_rating:.1f}/5")
+        if rating_count:
+            content_parts.append(f"⭐ Average rating: {rating_sum / rating_count:.1f}/5")
             content_parts.append(f"🌟 Highest rated: {best_rated['rating']}/5 from {best_rated['seller']}")
         
         return RAGInsight(
@@ -203,11 +258,11 @@ class RAGEngine:
             ""
         ]
         
-        for alt in alternatives[:3]:
-            # Search for knowledge about the alternative
-            alt_knowledge = self.knowledge_base.search_knowledge(alt, top_k=1)
+        # Search for knowledge about the alternatives in one batch
+        alt_hits = self.knowledge_base.search_knowledge_batch(alternatives[:3], top_k=1)
+        for alt, alt_knowledge in zip(alternatives[:3], alt_hits):
             if alt_knowledge:
-                metadata = alt_knowledge[0]["metadata"]
+                metadata = alt_knowledge[0].metadata
                 if metadata.get("type") == "product_knowledge":
                     price_min = metadata.get("price_min", 0)
                     price_max = metadata.get("price_max", 0)
@@ -292,8 +347,9 @@ class RAGEngine:
                 except (ValueError, TypeError):
                     continue
         
-        # Save updated knowledge
-        self.knowledge_base.save_knowledge_base()
+        # Save updated knowledge in the background, so the search that
+        # triggered it is not held up
+        self.knowledge_base.save_knowledge_base(async_=True)
     
     def _update_price_insights(self, product_name: str, price: float, seller: str):
         """Update price insights with new data."""
@@ -310,22 +366,18 @@ class RAGEngine:
                 "source": seller
             })
             
-            # Keep only last 30 price points
-            insight.historical_prices = insight.historical_prices[-30:]
+            # Keep only the newest price points, trimming the list in place
+            # rather than copying it on every update
+            del insight.historical_prices[:-MAX_PRICE_HISTORY]
             
             # Update current price and trend
             insight.current_price = price
             insight.last_updated = datetime.now().isoformat()
             
-            # Simple trend analysis
-            if len(insight.historical_prices) >= 3:
-                recent_prices = [p["price"] for p in insight.historical_prices[-3:]]
-                if recent_prices[-1] > recent_prices[0]:
-                    insight.price_trend = "increasing"
-                elif recent_prices[-1] < recent_prices[0]:
-                    insight.price_trend = "decreasing"
-                else:
-                    insight.price_trend = "stable"
+            # Simple trend analysis over the newest points only
+            if len(insight.historical_prices) >= TREND_WINDOW:
+                recent_prices = insight.price_array(last=TREND_WINDOW)
+                insight.price_trend = TREND_LABELS[price_trend_direction(recent_prices, TREND_WINDOW)]
         
         else:
             # Create new insight
@@ -4,12 +4,19 @@ Handles embedding storage and retrieval for product knowledge.
 """
 
 import json
+import os
 import pickle
+import re
+import sys
+import threading
+from functools import lru_cache
 import numpy as np
 from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass
 from pathlib import Path
 import hashlib
+import orjson
+import xxhash
 from loguru import logger
 from sentence_transformers import SentenceTransformer
 import faiss
@@ -24,43 +31,223 @@ class Document:
     metadata: Dict[str, Any]
     embedding: Optional[np.ndarray] = None
     created_at: str = ""
+    faiss_id: int = -1  # Key of the document's vector in the FAISS index
     
     def __post_init__(self):
         if not self.created_at:
             self.created_at = datetime.now().isoformat()
 
 
+# HNSW graph parameters: links per node, and candidate list sizes while
+# building and searching
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 64
+
+# FAISS search threads: enough to spread a query batch across cores,
+# capped so the encoder's own thread pool is not crowded out
+FAISS_THREADS = min(os.cpu_count() or 1, 8)
+
+# Quantized int8 export of the encoder, loaded by the ONNX backend
+ONNX_MODEL_FILE = "onnx/model_quint8_avx2.onnx"
+
+# Store size at which an "auto" index moves from exact search to HNSW
+AUTO_HNSW_MIN_DOCUMENTS = 10_000
+
+# Document IDs made by older versions: MD5 of the content and of the metadata
+_LEGACY_DOC_ID = re.compile(r'[0-9a-f]{32}_[0-9a-f]{32}')
+
+# Past queries remembered by the semantic cache
+SEMANTIC_CACHE_SIZE = 1024
+
+# Metadata fields drawn from a small set of values ("Apple", "smartphone",
+# ...); interned so every document shares one copy of each string
+_SHARED_METADATA_KEYS = ("type", "brand", "category", "trend")
+
+
+def _unit_range(dim: int) -> np.ndarray:
+    """Training set for 8-bit quantizers.
+    
+    Normalized embeddings never leave [-1, 1], so each dimension is quantized
+    over that fixed range instead of one learned from whichever documents
+    happen to be added first.
+    """
+    return np.vstack([-np.ones(dim, dtype=np.float32), np.ones(dim, dtype=np.float32)])
+
+
+class _SemanticCache:
+    """Ring buffer of past query embeddings and their results, matched by cosine similarity."""
+    
+    def __init__(self, dim: int, size: int, threshold: float):
+        self.threshold = threshold
+        self.hits = 0
+        self._vectors = np.zeros((size, dim), dtype=np.float32)
+        self._entries: List[Optional[Tuple[Tuple, List[Tuple[Document, float]]]]] = [None] * size
+        self._next = 0
+        self._count = 0
+    
+    def get(self, embedding: np.ndarray, key: Tuple) -> Optional[List[Tuple[Document, float]]]:
+        """Return the results of the closest past query with the same search parameters."""
+        if not self._count:
+            return None
+        similarities = self._vectors[:self._count] @ embedding
+        close = np.flatnonzero(similarities >= self.threshold)
+        for i in close[np.argsort(-similarities[close], kind='stable')]:
+            entry_key, results = self._entries[i]
+            if entry_key == key:
+                self.hits += 1
+                return results
+        return None
+    
+    def put(self, embedding: np.ndarray, key: Tuple, results: List[Tuple[Document, float]]):
+        """Remember a query's results, evicting the oldest entry when full."""
+        self._vectors[self._next] = embedding
+        self._entries[self._next] = (key, results)
+        self._next = (self._next + 1) % len(self._entries)
+        self._count = min(self._count + 1, len(self._entries))
+    
+    def clear(self):
+        """Forget every entry; called whenever the stored documents change."""
+        self._entries = [None] * len(self._entries)
+        self._next = 0
+        self._count = 0
+
+
 class VectorStore:
     """Vector store for product knowledge and price history."""
     
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2", index_path: str = "data/vector_index"):
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2", index_path: str = "data/vector_index",
+                 index_type: str = "auto", semantic_cache_threshold: Optional[float] = 0.97,
+                 legacy_doc_ids: bool = False, quantize: bool = False, backend: str = "torch"):
         """
         Initialize vector store.
         
         Args:
             model_name: Sentence transformer model name
             index_path: Path to store the FAISS index
+            index_type: "flat" for exact search, "hnsw" for approximate
+                search that stays fast as the store grows, or "auto" to
+                start flat and switch to HNSW once the store is large
+            semantic_cache_threshold: Cosine similarity at which a new query
+                reuses the results of an earlier one; None disables the cache
+            legacy_doc_ids: Generate the MD5-based document IDs of older
+                versions; switched on automatically for stores saved with them
+            quantize: Keep vectors in the index as 8-bit codes, a quarter of
+                the memory of float32 at a small cost in score precision.
+                Applies to new indexes; saved ones keep their type
+            backend: "torch" to run the encoder in PyTorch, or "onnx" to run
+                its int8-quantized export in ONNX Runtime, which encodes
+                faster on CPU (needs sentence-transformers[onnx])
         """
+        if index_type not in ("auto", "flat", "hnsw"):
+            raise ValueError(f"Unknown index type: {index_type}")
+        if backend not in ("torch", "onnx"):
+            raise ValueError(f"Unknown encoder backend: {backend}")
+        
         self.model_name = model_name
+        self.index_type = index_type
+        self.legacy_doc_ids = legacy_doc_ids
+        self.quantize = quantize
+        self.backend = backend
         self.index_path = Path(index_path)
         self.index_path.mkdir(parents=True, exist_ok=True)
         
         # Initialize sentence transformer
-        logger.info(f"Loading embedding model: {model_name}")
-        self.encoder = SentenceTransformer(model_name)
+        logger.info(f"Loading embedding model: {model_name} ({backend})")
+        if backend == "onnx":
+            self.encoder = SentenceTransformer(model_name, backend="onnx",
+                                               model_kwargs={"file_name": ONNX_MODEL_FILE})
+        else:
+            self.encoder = SentenceTransformer(model_name)
         self.embedding_dim = self.encoder.get_sentence_embedding_dimension()
         
+        # Guards the documents and index against a save on another thread
+        self._lock = threading.Lock()
+        
         # Initialize FAISS index
-        self.index = faiss.IndexFlatIP(self.embedding_dim)  # Inner product for cosine similarity
+        faiss.omp_set_num_threads(FAISS_THREADS)
+        self.index = self._create_index()
         self.documents: Dict[str, Document] = {}
         
+        # Vectors are keyed by a per-document FAISS ID, so deleting a
+        # document never shifts the mapping of the others
+        self._id_to_doc: Dict[int, Document] = {}
+        self._next_id = 0
+        
+        # FAISS IDs per document type, so searches can be restricted to one
+        # type inside FAISS instead of filtering the hits afterwards
+        self._type_ids: Dict[str, List[int]] = {}
+        
+        # Repeated queries reuse their embedding instead of another encoder
+        # pass; the encoder is deterministic, so entries never go stale
+        self._embed_query_cached = lru_cache(maxsize=1024)(self._embed_query)
+        
+        # Near-duplicate queries ("iphone 16 price", "iphone 16 cost") reuse
+        # earlier results instead of searching the index again
+        self._semantic_cache = None
+        if semantic_cache_threshold is not None:
+            self._semantic_cache = _SemanticCache(self.embedding_dim, SEMANTIC_CACHE_SIZE, semantic_cache_threshold)
+        
         # Load existing index if available
         self._load_index()
         
         logger.info(f"Vector store initialized with {len(self.documents)} documents")
     
+    def _create_index(self) -> faiss.Index:
+        """Create an empty index; inner product on normalized vectors is cosine similarity."""
+        if self.index_type == "hnsw":
+            return faiss.IndexIDMap2(self._create_hnsw_index())
+        return faiss.IndexIDMap2(self._create_flat_index())
+    
+    def _base_index(self) -> faiss.Index:
+        """The index holding the vectors, beneath the ID mapping."""
+        return faiss.downcast_index(self.index.index)
+    
+    def _create_flat_index(self) -> faiss.Index:
+        """Create an empty exact-search index."""
+        if self.quantize:
+            index = faiss.IndexScalarQuantizer(self.embedding_dim, faiss.ScalarQuantizer.QT_8bit,
+                                               faiss.METRIC_INNER_PRODUCT)
+            index.train(_unit_range(self.embedding_dim))
+            return index
+        return faiss.IndexFlatIP(self.embedding_dim)
+    
+    def _create_hnsw_index(self) -> faiss.Index:
+        """Create an empty HNSW index."""
+        if self.quantize:
+            index = faiss.IndexHNSWSQ(self.embedding_dim, faiss.ScalarQuantizer.QT_8bit, HNSW_M,
+                                      faiss.METRIC_INNER_PRODUCT)
+            index.train(_unit_range(self.embedding_dim))
+        else:
+            index = faiss.IndexHNSWFlat(self.embedding_dim, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        index.hnsw.efSearch = HNSW_EF_SEARCH
+        return index
+    
+    def _maybe_switch_to_hnsw(self):
+        """Rebuild an "auto" flat index as HNSW once it holds enough vectors."""
+        base = self._base_index()
+        if (self.index_type != "auto"
+                or not isinstance(base, (faiss.IndexFlat, faiss.IndexScalarQuantizer))
+                or base.ntotal < AUTO_HNSW_MIN_DOCUMENTS):
+            return
+        
+        # A flat index keeps the vectors (exact or quantized), so the graph is
+        # built from them in place of re-encoding the documents
+        index = faiss.IndexIDMap2(self._create_hnsw_index())
+        index.add_with_ids(base.reconstruct_n(0, base.ntotal), faiss.vector_to_array(self.index.id_map))
+        self.index = index
+        logger.info(f"Switched vector index to HNSW at {index.ntotal} vectors")
+    
     def _generate_doc_id(self, content: str, metadata: Dict[str, Any]) -> str:
         """Generate unique document ID."""
+        if not self.legacy_doc_ids:
+            # One xxh3 pass over the content and the canonical metadata
+            digest = xxhash.xxh3_128(content.encode())
+            digest.update(b'\x00')
+            digest.update(orjson.dumps(metadata, option=orjson.OPT_SORT_KEYS | orjson.OPT_SERIALIZE_NUMPY))
+            return digest.hexdigest()
+        
         content_hash = hashlib.md5(content.encode()).hexdigest()
         metadata_str = json.dumps(metadata, sort_keys=True)
         metadata_hash = hashlib.md5(metadata_str.encode()).hexdigest()
@@ -77,42 +264,87 @@ class VectorStore:
         Returns:
             Document ID
         """
-        doc_id = self._generate_doc_id(content, metadata)
-        
-        # Skip if document already exists
-        if doc_id in self.documents:
-            return doc_id
+        return self.add_documents([(content, metadata)])[0]
+    
+    def add_documents(self, documents: List[Tuple[str, Dict[str, Any]]]) -> List[str]:
+        """
+        Add multiple documents with one encoder call and one index insert.
         
-        # Generate embedding
-        embedding = self.encoder.encode([content])[0]
+        Args:
+            documents: (content, metadata) pairs
+            
+        Returns:
+            Document IDs, in input order
+        """
+        doc_ids = []
+        new_docs: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        for content, metadata in documents:
+            doc_id = self._generate_doc_id(content, metadata)
+            doc_ids.append(doc_id)
+            
+            # Skip documents already stored or repeated within the batch
+            if doc_id not in self.documents and doc_id not in new_docs:
+                new_docs[doc_id] = (content, metadata)
         
-        # Normalize for cosine similarity
-        embedding = embedding / np.linalg.norm(embedding)
+        if not new_docs:
+            return doc_ids
         
-        # Create document
-        doc = Document(
-            id=doc_id,
-            content=content,
-            metadata=metadata,
-            embedding=embedding
+        # Generate embeddings for the whole batch, normalized by the encoder
+        # so inner product is cosine similarity
+        embeddings = self.encoder.encode(
+            [content for content, _ in new_docs.values()],
+            batch_size=64,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False
         )
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
         
-        # Add to index
-        self.index.add(embedding.reshape(1, -1))
-        self.documents[doc_id] = doc
+        # Documents and their vectors go in together, so a save running in
+        # the background never sees one without the other
+        with self._lock:
+            faiss_ids = np.empty(len(new_docs), dtype=np.int64)
+            for i, ((doc_id, (content, metadata)), embedding) in enumerate(zip(new_docs.items(), embeddings)):
+                faiss_ids[i] = self._store(Document(
+                    id=doc_id,
+                    content=content,
+                    metadata=metadata,
+                    embedding=embedding
+                ))
+            self.index.add_with_ids(embeddings, faiss_ids)
+            self._clear_semantic_cache()
+            
+            self._maybe_switch_to_hnsw()
         
-        logger.debug(f"Added document: {doc_id}")
-        return doc_id
-    
-    def add_documents(self, documents: List[Tuple[str, Dict[str, Any]]]) -> List[str]:
-        """Add multiple documents."""
-        doc_ids = []
-        for content, metadata in documents:
-            doc_id = self.add_document(content, metadata)
-            doc_ids.append(doc_id)
+        logger.debug(f"Added {len(new_docs)} documents")
         return doc_ids
     
-    def search(self, query: str, top_k: int = 5, min_score: float = 0.3) -> List[Tuple[Document, float]]:
+    def _embed_query(self, query: str) -> np.ndarray:
+        """Encode a query as a normalized, read-only float32 vector."""
+        embedding = self.encoder.encode([query], normalize_embeddings=True, show_progress_bar=False)[0]
+        embedding = np.ascontiguousarray(embedding, dtype=np.float32)
+        embedding.flags.writeable = False
+        return embedding
+    
+    def _store(self, doc: Document) -> int:
+        """Register a document, assigning it the next FAISS ID if it has none."""
+        if doc.faiss_id < 0:
+            doc.faiss_id = self._next_id
+        self._next_id = max(self._next_id, doc.faiss_id + 1)
+        
+        metadata = doc.metadata
+        for key in _SHARED_METADATA_KEYS:
+            value = metadata.get(key)
+            if isinstance(value, str):
+                metadata[key] = sys.intern(value)
+        
+        self._type_ids.setdefault(metadata.get("type"), []).append(doc.faiss_id)
+        self._id_to_doc[doc.faiss_id] = doc
+        self.documents[doc.id] = doc
+        return doc.faiss_id
+    
+    def search(self, query: str, top_k: int = 5, min_score: float = 0.3,
+               filter_type: Optional[str] = None) -> List[Tuple[Document, float]]:
         """
         Search for similar documents.
         
@@ -120,6 +352,7 @@ class VectorStore:
             query: Search query
             top_k: Number of results to return
             min_score: Minimum similarity score
+            filter_type: Only consider documents whose metadata "type" matches
             
         Returns:
             List of (document, score) tuples
@@ -128,21 +361,98 @@ class VectorStore:
             return []
         
         # Generate query embedding
-        query_embedding = self.encoder.encode([query])[0]
-        query_embedding = query_embedding / np.linalg.norm(query_embedding)
+        query_embedding = self._embed_query_cached(query)
         
-        # Search in FAISS index
-        scores, indices = self.index.search(query_embedding.reshape(1, -1), min(top_k, len(self.documents)))
+        if self._semantic_cache is None:
+            return self._search_index(query_embedding.reshape(1, -1), top_k, min_score, filter_type)[0]
         
-        results = []
-        doc_list = list(self.documents.values())
+        key = (top_k, min_score, filter_type)
+        results = self._semantic_cache.get(query_embedding, key)
+        if results is None:
+            results = self._search_index(query_embedding.reshape(1, -1), top_k, min_score, filter_type)[0]
+            self._semantic_cache.put(query_embedding, key, results)
+        return list(results)
+    
+    def search_batch(self, queries: List[str], top_k: int = 5, min_score: float = 0.3,
+                     filter_type: Optional[str] = None) -> List[List[Tuple[Document, float]]]:
+        """
+        Search for several queries at once.
         
-        for score, idx in zip(scores[0], indices[0]):
-            if score >= min_score:
-                doc = doc_list[idx]
-                results.append((doc, float(score)))
+        The queries are encoded in one encoder pass and looked up in one
+        FAISS call, which spreads them across threads.
         
-        return results
+        Args:
+            queries: Search queries
+            top_k: Number of results to return per query
+            min_score: Minimum similarity score
+            filter_type: Only consider documents whose metadata "type" matches
+            
+        Returns:
+            One list of (document, score) tuples per query, in query order
+        """
+        if not queries or len(self.documents) == 0:
+            return [[] for _ in queries]
+        
+        embeddings = self.encoder.encode(list(queries), batch_size=64, normalize_embeddings=True,
+                                         show_progress_bar=False)
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        
+        if self._semantic_cache is None:
+            return self._search_index(embeddings, top_k, min_score, filter_type)
+        
+        # Only the queries the semantic cache cannot answer go to the index
+        key = (top_k, min_score, filter_type)
+        results = [self._semantic_cache.get(embedding, key) for embedding in embeddings]
+        misses = [i for i, found in enumerate(results) if found is None]
+        if misses:
+            found = self._search_index(embeddings[misses], top_k, min_score, filter_type)
+            for i, hits in zip(misses, found):
+                self._semantic_cache.put(embeddings[i], key, hits)
+                results[i] = hits
+        return [list(hits) for hits in results]
+    
+    def _search_index(self, query_embeddings: np.ndarray, top_k: int, min_score: float,
+                      filter_type: Optional[str]) -> List[List[Tuple[Document, float]]]:
+        """Search the FAISS index with a matrix of embedded queries, one result list per row."""
+        # Vectors of deleted documents that the index could not drop are
+        # skipped below, so ask for enough hits to make up for them
+        params = None
+        candidates = min(top_k + self.index.ntotal - len(self._id_to_doc), self.index.ntotal)
+        
+        # Restrict the search to one document type with an ID selector
+        if filter_type is not None:
+            type_ids = self._type_ids.get(filter_type)
+            if not type_ids:
+                return [[] for _ in range(len(query_embeddings))]
+            candidates = min(top_k, len(type_ids))
+            selector = faiss.IDSelectorBatch(np.array(type_ids, dtype=np.int64))
+            if isinstance(self._base_index(), faiss.IndexHNSW):
+                params = faiss.SearchParametersHNSW(sel=selector, efSearch=HNSW_EF_SEARCH)
+            else:
+                params = faiss.SearchParameters(sel=selector)
+        
+        # Search in FAISS index
+        scores, indices = self.index.search(query_embeddings, candidates, params=params)
+        
+        # Plain Python numbers, converted in one call rather than per hit
+        all_results = []
+        for row_scores, row_indices in zip(scores.tolist(), indices.tolist()):
+            results = []
+            for score, idx in zip(row_scores, row_indices):
+                # Indexes pad with -1 when they find fewer hits
+                doc = self._id_to_doc.get(idx)
+                if doc is not None and score >= min_score:
+                    results.append((doc, score))
+                    if len(results) == top_k:
+                        break
+            all_results.append(results)
+        
+        return all_results
+    
+    def _clear_semantic_cache(self):
+        """Drop cached results once the stored documents change."""
+        if self._semantic_cache is not None:
+            self._semantic_cache.clear()
     
     def get_document(self, doc_id: str) -> Optional[Document]:
         """Get document by ID."""
@@ -150,36 +460,66 @@ class VectorStore:
     
     def delete_document(self, doc_id: str) -> bool:
         """Delete document by ID."""
-        if doc_id in self.documents:
-            del self.documents[doc_id]
-            # Note: FAISS doesn't support deletion, so we'd need to rebuild index
-            # For now, just remove from documents dict
+        with self._lock:
+            doc = self.documents.pop(doc_id, None)
+            if doc is None:
+                return False
+            
+            del self._id_to_doc[doc.faiss_id]
+            self._type_ids[doc.metadata.get("type")].remove(doc.faiss_id)
+            self._clear_semantic_cache()
+            
+            # HNSW graphs cannot drop vectors; search() skips the orphaned one
+            try:
+                self.index.remove_ids(np.array([doc.faiss_id], dtype=np.int64))
+            except RuntimeError:
+                pass
             return True
-        return False
     
     def save_index(self):
         """Save index and documents to disk."""
-        try:
-            # Save FAISS index
-            faiss.write_index(self.index, str(self.index_path / "faiss.index"))
-            
-            # Save documents (without embeddings to save space)
-            docs_to_save = {}
-            for doc_id, doc in self.documents.items():
-                docs_to_save[doc_id] = {
-                    'id': doc.id,
-                    'content': doc.content,
-                    'metadata': doc.metadata,
-                    'created_at': doc.created_at
-                }
-            
-            with open(self.index_path / "documents.json", 'w') as f:
-                json.dump(docs_to_save, f, indent=2)
-            
-            logger.info(f"Saved vector store with {len(self.documents)} documents")
-            
-        except Exception as e:
-            logger.error(f"Error saving index: {e}")
+        # Held for the whole save, so documents cannot change underneath it
+        with self._lock:
+            try:
+                # Save FAISS index. The loaded file may still be memory-mapped,
+                # so write a new file and swap it in rather than overwrite pages
+                # in use
+                faiss_path = self.index_path / "faiss.index"
+                tmp_path = faiss_path.with_suffix(".index.tmp")
+                faiss.write_index(self.index, str(tmp_path))
+                os.replace(tmp_path, faiss_path)
+                
+                # Save embeddings in document order, so loading needs no encoder pass
+                if self.documents:
+                    embeddings = np.stack([doc.embedding for doc in self.documents.values()])
+                    embeddings_path = self.index_path / "embeddings.npy"
+                    tmp_path = embeddings_path.with_suffix(".npy.tmp")
+                    with open(tmp_path, 'wb') as f:
+                        np.save(f, embeddings.astype(np.float32, copy=False))
+                    os.replace(tmp_path, embeddings_path)
+                
+                # Save documents (without embeddings to save space)
+                docs_to_save = {}
+                for doc_id, doc in self.documents.items():
+                    docs_to_save[doc_id] = {
+                        'id': doc.id,
+                        'content': doc.content,
+                        'metadata': doc.metadata,
+                        'created_at': doc.created_at,
+                        'faiss_id': doc.faiss_id
+                    }
+                
+                # Compact orjson, written in one call and swapped in like the
+                # index; the file is only read back by _load_index
+                docs_path = self.index_path / "documents.json"
+                tmp_path = docs_path.with_suffix(".json.tmp")
+                tmp_path.write_bytes(orjson.dumps(docs_to_save, option=orjson.OPT_SERIALIZE_NUMPY))
+                os.replace(tmp_path, docs_path)
+                
+                logger.info(f"Saved vector store with {len(self.documents)} documents")
+                
+            except Exception as e:
+                logger.error(f"Error saving index: {e}")
     
     def _load_index(self):
         """Load index and documents from disk."""
@@ -188,22 +528,36 @@ class VectorStore:
             docs_path = self.index_path / "documents.json"
             
             if faiss_path.exists() and docs_path.exists():
-                # Load FAISS index
-                self.index = faiss.read_index(str(faiss_path))
+                # Load FAISS index, whichever type it was saved as. Index
+                # types that support it are memory-mapped rather than read up
+                # front, so startup does not grow with the index; new vectors
+                # still go to memory. The search-time HNSW setting is not
+                # part of the file
+                index = faiss.read_index(str(faiss_path), faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+                self.index = index if isinstance(index, faiss.IndexIDMap2) else self._add_id_map(index)
+                base = self._base_index()
+                if isinstance(base, faiss.IndexHNSW):
+                    base.hnsw.efSearch = HNSW_EF_SEARCH
+                self._maybe_switch_to_hnsw()
+                
+                # Never reuse the ID of a vector still in the index, such as
+                # one an HNSW graph kept after its document was deleted
+                if self.index.ntotal:
+                    self._next_id = int(faiss.vector_to_array(self.index.id_map).max()) + 1
                 
                 # Load documents
-                with open(docs_path, 'r') as f:
-                    docs_data = json.load(f)
+                docs_data = orjson.loads(docs_path.read_bytes())
                 
-                # Reconstruct documents with embeddings
-                contents = []
-                for doc_data in docs_data.values():
-                    contents.append(doc_data['content'])
+                # Keep generating the ID format the store was saved with, so
+                # re-adding a document still finds its existing entry
+                if docs_data and _LEGACY_DOC_ID.fullmatch(next(iter(docs_data))):
+                    self.legacy_doc_ids = True
                 
-                if contents:
-                    # Regenerate embeddings
-                    embeddings = self.encoder.encode(contents)
-                    embeddings = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+                # Reconstruct documents with embeddings
+                if docs_data:
+                    # Stores saved before FAISS IDs were kept used row positions
+                    faiss_ids = [doc_data.get('faiss_id', i) for i, doc_data in enumerate(docs_data.values())]
+                    embeddings = self._load_embeddings(docs_data, faiss_ids)
                     
                     for i, (doc_id, doc_data) in enumerate(docs_data.items()):
                         doc = Document(
@@ -211,23 +565,67 @@ class VectorStore:
                             content=doc_data['content'],
                             metadata=doc_data['metadata'],
                             embedding=embeddings[i],
-                            created_at=doc_data['created_at']
+                            created_at=doc_data['created_at'],
+                            faiss_id=faiss_ids[i]
                         )
-                        self.documents[doc_id] = doc
+                        self._store(doc)
                 
                 logger.info(f"Loaded vector store with {len(self.documents)} documents")
                 
         except Exception as e:
             logger.warning(f"Could not load existing index: {e}")
             # Initialize empty index
-            self.index = faiss.IndexFlatIP(self.embedding_dim)
+            self.index = self._create_index()
             self.documents = {}
+            self._id_to_doc = {}
+            self._next_id = 0
+            self._type_ids = {}
+    
+    def _add_id_map(self, index: faiss.Index) -> faiss.Index:
+        """Move an index saved without an ID mapping under one, keyed by row position."""
+        if isinstance(index, faiss.IndexHNSW):
+            mapped = faiss.IndexIDMap2(self._create_hnsw_index())
+        else:
+            mapped = faiss.IndexIDMap2(faiss.IndexFlatIP(self.embedding_dim))
+        if index.ntotal:
+            mapped.add_with_ids(index.reconstruct_n(0, index.ntotal), np.arange(index.ntotal, dtype=np.int64))
+        return mapped
+    
+    def _load_embeddings(self, docs_data: Dict[str, Dict[str, Any]], faiss_ids: List[int]) -> np.ndarray:
+        """Load saved document embeddings, falling back to the index or the encoder."""
+        
+        # Memory-mapped, so only the rows that are read get paged in
+        embeddings_path = self.index_path / "embeddings.npy"
+        if embeddings_path.exists():
+            embeddings = np.load(embeddings_path, mmap_mode='r')
+            if len(embeddings) == len(docs_data):
+                return embeddings
+        
+        # Stores saved before embeddings were kept: flat and HNSW indexes
+        # hold the raw vectors
+        try:
+            return np.vstack([self.index.reconstruct(faiss_id) for faiss_id in faiss_ids])
+        except RuntimeError:
+            pass
+        
+        logger.info("Re-encoding stored documents")
+        return self.encoder.encode(
+            [doc_data['content'] for doc_data in docs_data.values()],
+            batch_size=64,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False
+        )
     
     def get_stats(self) -> Dict[str, Any]:
         """Get vector store statistics."""
+        cache_info = self._embed_query_cached.cache_info()
         return {
             "total_documents": len(self.documents),
             "embedding_dimension": self.embedding_dim,
             "model_name": self.model_name,
-            "index_size": self.index.ntotal
+            "index_size": self.index.ntotal,
+            "query_cache_hits": cache_info.hits,
+            "query_cache_misses": cache_info.misses,
+            "semantic_cache_hits": self._semantic_cache.hits if self._semantic_cache is not None else 0
         }
@@ -6,18 +6,146 @@ Specialized version with India-specific features and better parsing.
 
 import asyncio
 import re
+from functools import lru_cache
 from datetime import datetime
-from typing import List, Optional
-from urllib.parse import quote_plus
+from typing import List, Optional, Tuple, Union
 
 from loguru import logger
+from selectolax.lexbor import LexborHTMLParser
 
 from ...core.base_scraper import BaseScraper, ProductResult, ScraperType
 
 
+# Patterns used for every product on a page, compiled once
+_NUMBER_RE = re.compile(r'(\d+\.?\d*)')
+_REVIEWS_RE = re.compile(r'[\(]?([0-9,]+)[\)]?')
+
+
+class _PriceCharTable(dict):
+    """str.translate table keeping decimal digits, '.' and ',' and deleting the rest.
+
+    Filled lazily: each character is classified the first time it is seen,
+    after which prices translate entirely in C.
+    """
+
+    def __missing__(self, code: int) -> Optional[int]:
+        keep = code if chr(code).isdecimal() or chr(code) in '.,' else None
+        self[code] = keep
+        return keep
+
+
+_PRICE_CHARS = _PriceCharTable()
+
+
+# Indian user agent and headers, the same for every request
+_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-IN,en;q=0.9,hi;q=0.8',
+    'Accept-Encoding': 'gzip, deflate, br',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+    'Cache-Control': 'max-age=0',
+}
+
+
+# Prices repeat across products and pages, so cleaned ones are cached
+@lru_cache(maxsize=1024)
+def _clean_price_text(price_text: str) -> Optional[str]:
+    """Clean and extract numeric price from INR text."""
+    if not price_text:
+        return None
+    
+    # Remove ₹ symbol and other non-numeric characters
+    price_clean = price_text.translate(_PRICE_CHARS)
+    
+    # Handle Indian number format (1,23,456.00)
+    if ',' in price_clean and '.' in price_clean:
+        # Format like 1,23,456.00
+        price_clean = price_clean.replace(',', '')
+    elif ',' in price_clean:
+        # Could be thousands separator or decimal (rare in India)
+        if len(price_clean) - price_clean.rfind(',') <= 3:
+            # Likely decimal separator (uncommon)
+            price_clean = price_clean.replace(',', '.')
+        else:
+            # Thousands separator
+            price_clean = price_clean.replace(',', '')
+    
+    try:
+        float(price_clean)
+        return price_clean
+    except ValueError:
+        return None
+
+
 class AmazonIndiaScraper(BaseScraper):
     """Specialized Amazon scraper for Indian market."""
 
+    # Product containers, tried in order until one matches
+    PRODUCT_SELECTORS = (
+        '[data-component-type="s-search-result"]',
+        '[data-asin]:not([data-asin=""])',
+        '.s-result-item[data-asin]',
+        '.s-widget-container[data-asin]',
+    )
+
+    # Product title selectors, tried in order
+    TITLE_SELECTORS = (
+        'h2 a span[aria-label]',
+        'h2 a span:not([class])',
+        'h2 .a-link-normal span',
+        '[data-cy="title-recipe-title"] span',
+        'h2 span',
+        '.a-size-medium.a-color-base',
+        '.a-size-base-plus',
+    )
+
+    # Price selectors, tried in order
+    PRICE_SELECTORS = (
+        '.a-price .a-offscreen',
+        '.a-price-whole',
+        '.a-price-range .a-price .a-offscreen',
+        '.a-price[data-a-color="price"] .a-offscreen',
+        '.a-price.a-text-price .a-offscreen',
+        '.sx-price .a-offscreen',
+    )
+
+    # Matches wherever any price selector would, for skipping unpriced cards
+    _ANY_PRICE_SELECTOR = ', '.join(PRICE_SELECTORS)
+
+    # Rating selectors, tried in order
+    RATING_SELECTORS = (
+        '.a-icon-alt',
+        '[aria-label*="stars"]',
+        '.a-star-mini .a-icon-alt',
+        '.a-icon-star-small .a-icon-alt',
+    )
+
+    # Review count selectors, tried in order
+    REVIEWS_SELECTORS = (
+        '.a-size-base',
+        '[aria-label*="reviews"]',
+        '.a-link-normal .a-size-base',
+        '.a-size-small .a-link-normal',
+    )
+
+    # Availability selectors, tried in order
+    AVAILABILITY_SELECTORS = (
+        '.a-size-base.a-color-price',
+        '.a-size-base.a-color-secondary',
+        '[data-cy="delivery-recipe"]',
+        '.a-color-state',
+    )
+
+    # Product image selectors, tried in order
+    IMAGE_SELECTORS = (
+        '.s-image',
+        'img[data-src]',
+        'img[src]',
+        '.a-dynamic-image',
+    )
+
     def __init__(self):
         super().__init__(
             name="Amazon India",
@@ -33,7 +161,7 @@ class AmazonIndiaScraper(BaseScraper):
 
     def build_search_url(self, query: str, country: str, **kwargs) -> str:
         """Build Amazon India search URL."""
-        encoded_query = quote_plus(query)
+        encoded_query = self._encode_query(query, **kwargs)
         return f"https://www.amazon.in/s?k={encoded_query}&ref=sr_pg_1&sort=relevanceblender"
 
     async def search(self, query: str, country: str, **kwargs) -> List[ProductResult]:
@@ -42,55 +170,43 @@ class AmazonIndiaScraper(BaseScraper):
             logger.warning(f"Amazon India: Country {country} not supported")
             return []
 
-        search_url = self.build_search_url(query, country)
+        search_url = self.build_search_url(query, country, **kwargs)
         logger.info(f"Amazon India: Searching {search_url}")
 
         try:
-            # Use Indian user agent and headers
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                'Accept-Language': 'en-IN,en;q=0.9,hi;q=0.8',
-                'Accept-Encoding': 'gzip, deflate, br',
-                'Connection': 'keep-alive',
-                'Upgrade-Insecure-Requests': '1',
-                'Cache-Control': 'max-age=0',
-            }
-
-            response = await self.session.get(search_url, headers=headers, timeout=30)
-            
-            if response.status == 200:
-                html_content = await response.text()
-                return await self._parse_search_results(html_content, query)
-            elif response.status == 503:
-                logger.warning("Amazon India: Service unavailable (503)")
-                return []
-            else:
-                logger.warning(f"Amazon India: HTTP {response.status}")
-                return []
+            async with self.session.get(search_url, headers=_HEADERS, timeout=30) as response:
+                if response.status == 200:
+                    # Raw bytes go straight to Lexbor, which decodes them in C
+                    html_content = await response.read()
+                    scraped_at = kwargs.get('scraped_at') or datetime.now().isoformat()
+                    # Parse off the event loop so the other scrapers' downloads
+                    # keep progressing while this page is processed
+                    return await asyncio.to_thread(
+                        self._parse_search_results, html_content, query, scraped_at
+                    )
+                elif response.status == 503:
+                    logger.warning("Amazon India: Service unavailable (503)")
+                    return []
+                else:
+                    logger.warning(f"Amazon India: HTTP {response.status}")
+                    return []
 
         except Exception as e:
             logger.error(f"Amazon India: Search failed: {e}")
             return []
 
-    async def _parse_search_results(self, html: str, query: str) -> List[ProductResult]:
+    def _parse_search_results(self, html: Union[str, bytes], query: str,
+                              scraped_at: Optional[str] = None) -> List[ProductResult]:
         """Parse Amazon India search results."""
-        from bs4 import BeautifulSoup
-        
-        soup = BeautifulSoup(html, 'html.parser')
+        # Lexbor parses the page and matches selectors in C, far faster than
+        # BeautifulSoup with html.parser
+        tree = LexborHTMLParser(html)
         results = []
 
         # Amazon India product containers
-        product_selectors = [
-            '[data-component-type="s-search-result"]',
-            '[data-asin]:not([data-asin=""])',
-            '.s-result-item[data-asin]',
-            '.s-widget-container[data-asin]',
-        ]
-
         products = []
-        for selector in product_selectors:
-            found_products = soup.select(selector)
+        for selector in self.PRODUCT_SELECTORS:
+            found_products = tree.css(selector)
             if found_products:
                 products = found_products
                 logger.info(f"Amazon India: Using selector {selector}")
@@ -98,11 +214,21 @@ class AmazonIndiaScraper(BaseScraper):
 
         logger.info(f"Amazon India: Found {len(products)} product containers")
 
-        for product in products[:20]:  # Limit to first 20 results
+        if scraped_at is None:
+            scraped_at = datetime.now().isoformat()
+
+        # Placeholder and sponsored cards without a price are skipped with one
+        # combined selector query instead of the full set of fallbacks, so a
+        # wider window of containers is scanned for the first 20 results
+        for product in products[:40]:
+            if product.css_first(self._ANY_PRICE_SELECTOR) is None:
+                continue
             try:
-                result = self._parse_product(product)
+                result = self._parse_product(product, scraped_at)
                 if result:
                     results.append(result)
+                    if len(results) == 20:
+                        break
             except Exception as e:
                 logger.debug(f"Amazon India: Error parsing product: {e}")
                 continue
@@ -110,40 +236,21 @@ class AmazonIndiaScraper(BaseScraper):
         logger.info(f"Amazon India: Parsed {len(results)} valid results")
         return results
 
-    def _parse_product(self, product_elem) -> Optional[ProductResult]:
+    def _parse_product(self, product_elem, scraped_at: str) -> Optional[ProductResult]:
         """Parse individual product from Amazon India search results."""
         try:
             # Extract ASIN
-            asin = product_elem.get('data-asin')
+            asin = product_elem.attributes.get('data-asin')
             if not asin:
                 return None
 
             # Extract product title with India-specific selectors
-            title_selectors = [
-                'h2 a span[aria-label]',
-                'h2 a span:not([class])',
-                'h2 .a-link-normal span',
-                '[data-cy="title-recipe-title"] span',
-                'h2 span',
-                '.a-size-medium.a-color-base',
-                '.a-size-base-plus',
-            ]
-
-            title = self._extract_text_with_fallback(product_elem, title_selectors)
+            title = self._extract_text_with_fallback(product_elem, self.TITLE_SELECTORS)
             if not title:
                 return None
 
             # Extract price with INR-specific parsing
-            price_selectors = [
-                '.a-price .a-offscreen',
-                '.a-price-whole',
-                '.a-price-range .a-price .a-offscreen',
-                '.a-price[data-a-color="price"] .a-offscreen',
-                '.a-price.a-text-price .a-offscreen',
-                '.sx-price .a-offscreen',
-            ]
-
-            price_text = self._extract_text_with_fallback(product_elem, price_selectors)
+            price_text = self._extract_text_with_fallback(product_elem, self.PRICE_SELECTORS)
             if not price_text:
                 return None
 
@@ -174,20 +281,20 @@ class AmazonIndiaScraper(BaseScraper):
                 seller="Amazon India",
                 image_url=image_url,
                 source=self.name,
-                scraped_at=datetime.now().isoformat()
+                scraped_at=scraped_at
             )
 
         except Exception as e:
             logger.debug(f"Amazon India: Error parsing product: {e}")
             return None
 
-    def _extract_text_with_fallback(self, element, selectors: List[str]) -> Optional[str]:
+    def _extract_text_with_fallback(self, element, selectors: Tuple[str, ...]) -> Optional[str]:
         """Extract text using multiple selector fallbacks."""
         for selector in selectors:
             try:
-                elem = element.select_one(selector)
+                elem = element.css_first(selector)
                 if elem:
-                    text = elem.get_text(strip=True)
+                    text = elem.text(strip=True)
                     if text and len(text) > 0:
                         return text
             except Exception:
@@ -196,38 +303,14 @@ class AmazonIndiaScraper(BaseScraper):
 
     def _clean_price(self, price_text: str) -> Optional[str]:
         """Clean and extract numeric price from INR text."""
-        if not price_text:
-            return None
-        
-        # Remove ₹ symbol and other non-numeric characters
-        price_clean = re.sub(r'[^\d,.]', '', price_text)
-        
-        # Handle Indian number format (1,23,456.00)
-        if ',' in price_clean and '.' in price_clean:
-            # Format like 1,23,456.00
-            price_clean = price_clean.replace(',', '')
-        elif ',' in price_clean:
-            # Could be thousands separator or decimal (rare in India)
-            parts = price_clean.split(',')
-            if len(parts[-1]) <= 2:
-                # Likely decimal separator (uncommon)
-                price_clean = price_clean.replace(',', '.')
-            else:
-                # Thousands separator
-                price_clean = price_clean.replace(',', '')
-        
-        try:
-            float(price_clean)
-            return price_clean
-        except ValueError:
-            return None
+        return _clean_price_text(price_text)
 
     def _extract_product_url(self, element) -> Optional[str]:
         """Extract product URL."""
         try:
-            link_elem = element.select_one('h2 a, .a-link-normal')
+            link_elem = element.css_first('h2 a, .a-link-normal')
             if link_elem:
-                href = link_elem.get('href', '')
+                href = link_elem.attributes.get('href') or ''
                 if href.startswith('/'):
                     return f"https://www.amazon.in{href}"
                 elif href.startswith('http'):
@@ -239,18 +322,11 @@ class AmazonIndiaScraper(BaseScraper):
     def _extract_rating(self, element) -> Optional[float]:
         """Extract product rating."""
         try:
-            rating_selectors = [
-                '.a-icon-alt',
-                '[aria-label*="stars"]',
-                '.a-star-mini .a-icon-alt',
-                '.a-icon-star-small .a-icon-alt',
-            ]
-            
-            for selector in rating_selectors:
-                rating_elem = element.select_one(selector)
+            for selector in self.RATING_SELECTORS:
+                rating_elem = element.css_first(selector)
                 if rating_elem:
-                    rating_text = rating_elem.get('aria-label', '') or rating_elem.get_text(strip=True)
-                    match = re.search(r'(\d+\.?\d*)', rating_text)
+                    rating_text = rating_elem.attributes.get('aria-label') or rating_elem.text(strip=True)
+                    match = _NUMBER_RE.search(rating_text)
                     if match:
                         rating = float(match.group(1))
                         if 0 <= rating <= 5:
@@ -262,19 +338,12 @@ class AmazonIndiaScraper(BaseScraper):
     def _extract_reviews_count(self, element) -> Optional[int]:
         """Extract number of reviews."""
         try:
-            reviews_selectors = [
-                '.a-size-base',
-                '[aria-label*="reviews"]',
-                '.a-link-normal .a-size-base',
-                '.a-size-small .a-link-normal',
-            ]
-            
-            for selector in reviews_selectors:
-                reviews_elem = element.select_one(selector)
+            for selector in self.REVIEWS_SELECTORS:
+                reviews_elem = element.css_first(selector)
                 if reviews_elem:
-                    reviews_text = reviews_elem.get_text(strip=True)
+                    reviews_text = reviews_elem.text(strip=True)
                     # Look for patterns like "1,234" or "(1,234)"
-                    match = re.search(r'[\(]?([0-9,]+)[\)]?', reviews_text)
+                    match = _REVIEWS_RE.search(reviews_text)
                     if match:
                         count_str = match.group(1).replace(',', '')
                         try:
@@ -290,17 +359,10 @@ class AmazonIndiaScraper(BaseScraper):
     def _extract_availability(self, element) -> Optional[str]:
         """Extract availability status."""
         try:
-            availability_selectors = [
-                '.a-size-base.a-color-price',
-                '.a-size-base.a-color-secondary',
-                '[data-cy="delivery-recipe"]',
-                '.a-color-state',
-            ]
-            
-            for selector in availability_selectors:
-                avail_elem = element.select_one(selector)
+            for selector in self.AVAILABILITY_SELECTORS:
+                avail_elem = element.css_first(selector)
                 if avail_elem:
-                    text = avail_elem.get_text(strip=True).lower()
+                    text = avail_elem.text(strip=True).lower()
                     if any(word in text for word in ['stock', 'available', 'delivery', 'ships', 'get it']):
                         return "In Stock"
                     elif any(word in text for word in ['out', 'unavailable', 'sold', 'temporarily']):
@@ -312,17 +374,10 @@ class AmazonIndiaScraper(BaseScraper):
     def _extract_image_url(self, element) -> Optional[str]:
         """Extract product image URL."""
         try:
-            img_selectors = [
-                '.s-image',
-                'img[data-src]',
-                'img[src]',
-                '.a-dynamic-image',
-            ]
-            
-            for selector in img_selectors:
-                img_elem = element.select_one(selector)
+            for selector in self.IMAGE_SELECTORS:
+                img_elem = element.css_first(selector)
                 if img_elem:
-                    img_url = img_elem.get('data-src') or img_elem.get('src')
+                    img_url = img_elem.attributes.get('data-src') or img_elem.attributes.get('src')
                     if img_url and ('amazon' in img_url or img_url.startswith('http')):
                         return img_url
         except Exception:
@@ -4,17 +4,103 @@ Supports multiple Amazon domains worldwide with intelligent product parsing.
 """
 
 import re
+from functools import lru_cache
 import json
 import asyncio
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, Union
 from urllib.parse import quote_plus, urljoin
 from datetime import datetime
-from bs4 import BeautifulSoup
+from selectolax.lexbor import LexborHTMLParser
 from loguru import logger
 
 from ...core.base_scraper import BaseScraper, ProductResult, ScraperType
 
 
+# Patterns used for every product on a page, compiled once
+_NUMBER_RE = re.compile(r'(\d+\.?\d*)')
+_REVIEWS_RE = re.compile(r'[\(]?([0-9,]+)[\)]?')
+_ASIN_URL_RE = re.compile(r'/(?:dp|gp/product)/([A-Z0-9]{10})')
+
+
+class _PriceCharTable(dict):
+    """str.translate table keeping decimal digits, '.' and ',' and deleting the rest.
+
+    Filled lazily: each character is classified the first time it is seen,
+    after which prices translate entirely in C.
+    """
+
+    def __missing__(self, code: int) -> Optional[int]:
+        keep = code if chr(code).isdecimal() or chr(code) in '.,' else None
+        self[code] = keep
+        return keep
+
+
+_PRICE_CHARS = _PriceCharTable()
+
+
+@lru_cache(maxsize=1024)
+def _amazon_search_url(domain: str, encoded_query: str, category: Optional[str]) -> str:
+    """Build an Amazon search URL; popular and retried queries reuse the string."""
+    # Build search URL with parameters for better results
+    url = f"https://{domain}/s"
+    params = {
+        'ref': 'sr_pg_1',
+        'sort': 'relevanceblender'  # Sort by relevance
+    }
+
+    # Add category filter if specified
+    if category is not None:
+        params['i'] = category
+
+    # Build final URL
+    param_string = '&'.join([f"k={encoded_query}"] + [f"{k}={quote_plus(v)}" for k, v in params.items()])
+    return f"{url}?{param_string}"
+
+
+# Amazon-specific headers, added to the rotating base headers
+_AMAZON_HEADERS = {
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.9',
+    'Accept-Encoding': 'gzip, deflate, br',
+    'Cache-Control': 'max-age=0',
+    'Sec-Fetch-Dest': 'document',
+    'Sec-Fetch-Mode': 'navigate',
+    'Sec-Fetch-Site': 'none',
+    'Sec-Fetch-User': '?1',
+    'Upgrade-Insecure-Requests': '1'
+}
+
+
+# Prices repeat across products and pages, so cleaned ones are cached
+@lru_cache(maxsize=1024)
+def _clean_price_text(price_text: str) -> Optional[str]:
+    """Clean and extract numeric price from text."""
+    if not price_text:
+        return None
+
+    # Remove currency symbols and extract numbers
+    price_clean = price_text.translate(_PRICE_CHARS)
+
+    # Handle different decimal separators
+    if ',' in price_clean and '.' in price_clean:
+        # Format like 1,234.56
+        price_clean = price_clean.replace(',', '')
+    elif ',' in price_clean:
+        # Could be European format 1234,56 or thousands separator 1,234
+        if price_clean.count(',') == 1 and len(price_clean) - price_clean.find(',') <= 3:
+            # Likely decimal separator
+            price_clean = price_clean.replace(',', '.')
+        else:
+            # Likely thousands separator
+            price_clean = price_clean.replace(',', '')
+
+    try:
+        float(price_clean)
+        return price_clean
+    except ValueError:
+        return None
+
+
 class AmazonScraper(BaseScraper):
     """Amazon scraper supporting multiple regions."""
 
@@ -49,6 +135,87 @@ class AmazonScraper(BaseScraper):
         'TR': 'TRY', 'AE': 'AED', 'SA': 'SAR', 'SG': 'SGD'
     }
 
+    # Product containers, tried in order until one matches
+    PRODUCT_SELECTORS = (
+        '[data-component-type="s-search-result"]',
+        '.s-result-item[data-asin]',
+        '.sg-col-inner .s-widget-container'
+    )
+
+    # Product title selectors, tried in order
+    TITLE_SELECTORS = (
+        # Modern Amazon layouts
+        'h2 a span[aria-label]',
+        'h2 a span:not([class])',
+        'h2 .a-link-normal span',
+        '[data-cy="title-recipe-title"] span',
+
+        # Legacy selectors
+        'h2 a span',
+        '.s-size-mini .s-link-style a',
+        'h2 .a-link-normal',
+        '.s-title-instructions-style h2 a span',
+
+        # Fallback selectors
+        '.s-title .a-link-normal',
+        '.a-size-base-plus',
+        '.a-size-medium',
+        'h2 span'
+    )
+
+    # Price selectors, tried in order
+    PRICE_SELECTORS = (
+        # Primary price selectors
+        '.a-price .a-offscreen',
+        '.a-price-whole',
+        '.a-price-range .a-price .a-offscreen',
+
+        # Alternative price formats
+        '.a-price-symbol + .a-price-whole',
+        '.a-price .a-price-whole',
+        '.a-price-fraction',
+
+        # Deal prices
+        '.a-price.a-text-price .a-offscreen',
+        '.a-price[data-a-color="price"] .a-offscreen',
+
+        # Fallback price selectors
+        '[data-a-color="price"]',
+        '.a-color-price',
+        '.sx-price .a-offscreen'
+    )
+
+    # Matches wherever any price selector would, for skipping unpriced cards
+    _ANY_PRICE_SELECTOR = ', '.join(PRICE_SELECTORS)
+
+    # Rating selectors, tried in order
+    RATING_SELECTORS = (
+        '.a-icon-alt',
+        '[aria-label*="stars"]',
+        '.a-star-mini .a-icon-alt'
+    )
+
+    # Review count selectors, tried in order
+    REVIEWS_SELECTORS = (
+        '.a-size-base',
+        '[aria-label*="reviews"]',
+        '.a-link-normal .a-size-base'
+    )
+
+    # Availability selectors, tried in order
+    AVAILABILITY_SELECTORS = (
+        '.a-size-base.a-color-price',
+        '.a-size-base.a-color-secondary',
+        '[data-cy="delivery-recipe"]'
+    )
+
+    # Product image selectors, tried in order
+    IMAGE_SELECTORS = (
+        '.s-image',
+        'img[data-src]',
+        'img[src]'
+    )
+
     def __init__(self):
         """Initialize Amazon scraper."""
         super().__init__(
@@ -71,23 +238,9 @@ class AmazonScraper(BaseScraper):
             country = 'US'  # Fallback to US
 
         domain = self.AMAZON_DOMAINS[country]
-        encoded_query = quote_plus(query)
-
-        # Build search URL with parameters for better results
-        url = f"https://{domain}/s"
-        params = {
-            'k': query,
-            'ref': 'sr_pg_1',
-            'sort': 'relevanceblender'  # Sort by relevance
-        }
-
-        # Add category filter if specified
-        if 'category' in kwargs:
-            params['i'] = kwargs['category']
-
-        # Build final URL
-        param_string = '&'.join([f"{k}={quote_plus(str(v))}" for k, v in params.items()])
-        return f"{url}?{param_string}"
+        encoded_query = self._encode_query(query, **kwargs)
+        category = str(kwargs['category']) if 'category' in kwargs else None
+        return _amazon_search_url(domain, encoded_query, category)
 
     async def search(self, query: str, country: str, **kwargs) -> List[ProductResult]:
         """Search Amazon for products."""
@@ -102,8 +255,14 @@ class AmazonScraper(BaseScraper):
 
             async with self.session.get(search_url, headers=headers) as response:
                 if response.status == 200:
-                    html = await response.text()
-                    return self._parse_search_results(html, country, query)
+                    # Raw bytes go straight to Lexbor, which decodes them in C
+                    html = await response.read()
+                    scraped_at = kwargs.get('scraped_at') or datetime.now().isoformat()
+                    # Parse off the event loop so the other scrapers' downloads
+                    # keep progressing while this page is processed
+                    return await asyncio.to_thread(
+                        self._parse_search_results, html, country, query, scraped_at
+                    )
                 elif response.status == 503:
                     logger.warning("Amazon: Service unavailable (503)")
                     return []
@@ -117,45 +276,46 @@ class AmazonScraper(BaseScraper):
 
     def _get_amazon_headers(self) -> Dict[str, str]:
         """Get Amazon-specific headers."""
-        headers = self._get_headers()
-        headers.update({
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.9',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'Cache-Control': 'max-age=0',
-            'Sec-Fetch-Dest': 'document',
-            'Sec-Fetch-Mode': 'navigate',
-            'Sec-Fetch-Site': 'none',
-            'Sec-Fetch-User': '?1',
-            'Upgrade-Insecure-Requests': '1'
-        })
-        return headers
-
-    def _parse_search_results(self, html: str, country: str, query: str) -> List[ProductResult]:
+        return {**self._get_headers(), **_AMAZON_HEADERS}
+
+    def _parse_search_results(self, html: Union[str, bytes], country: str, query: str,
+                              scraped_at: Optional[str] = None) -> List[ProductResult]:
         """Parse Amazon search results."""
-        soup = BeautifulSoup(html, 'lxml')
+        # Lexbor parses the page and matches selectors in C, several times
+        # faster than BeautifulSoup with lxml
+        tree = LexborHTMLParser(html)
         results = []
 
-        # Multiple selectors for different Amazon layouts
-        product_selectors = [
-            '[data-component-type="s-search-result"]',
-            '.s-result-item[data-asin]',
-            '.sg-col-inner .s-widget-container'
-        ]
-
+        # Container selectors for different Amazon layouts, in turn
         products = []
-        for selector in product_selectors:
-            products = soup.select(selector)
+        for selector in self.PRODUCT_SELECTORS:
+            products = tree.css(selector)
             if products:
                 break
 
         logger.info(f"Amazon: Found {len(products)} product containers")
 
-        for product in products[:20]:  # Limit to first 20 results
+        if scraped_at is None:
+            scraped_at = datetime.now().isoformat()
+
+        # The country is fixed for the whole page, so its domain and currency
+        # are resolved once here rather than for every product
+        country = country.upper()
+        url_prefix = f"https://{self.AMAZON_DOMAINS.get(country, 'amazon.com')}"
+        currency = self.CURRENCY_MAP.get(country, 'USD')
+
+        # Placeholder and sponsored cards without a price are skipped with one
+        # combined selector query instead of the full set of fallbacks, so a
+        # wider window of containers is scanned for the first 20 results
+        for product in products[:40]:
+            if product.css_first(self._ANY_PRICE_SELECTOR) is None:
+                continue
             try:
-                result = self._parse_product(product, country)
+                result = self._parse_product(product, url_prefix, currency, scraped_at)
                 if result:
                     results.append(result)
+                    if len(results) == 20:
+                        break
             except Exception as e:
                 logger.debug(f"Amazon: Error parsing product: {e}")
                 continue
@@ -163,67 +323,31 @@ class AmazonScraper(BaseScraper):
         logger.info(f"Amazon: Parsed {len(results)} valid results")
         return results
 
-    def _parse_product(self, product_elem, country: str) -> Optional[ProductResult]:
+    def _parse_product(self, product_elem, url_prefix: str, currency: str,
+                       scraped_at: str) -> Optional[ProductResult]:
         """Parse individual product from Amazon search results with advanced fallback strategies."""
         try:
+            # The product link gives both the ASIN fallback and the URL, so
+            # it is looked up once
+            href = self._extract_link_href(product_elem)
+            
             # Extract ASIN with multiple strategies
-            asin = (product_elem.get('data-asin') or
-                   product_elem.get('data-uuid') or
-                   self._extract_asin_from_url(product_elem))
+            asin = (product_elem.attributes.get('data-asin') or
+                   product_elem.attributes.get('data-uuid') or
+                   self._extract_asin_from_url(href))
 
             if not asin:
                 logger.debug("Amazon: No ASIN found, skipping product")
                 return None
 
             # Extract product title with comprehensive selectors
-            title_selectors = [
-                # Modern Amazon layouts
-                'h2 a span[aria-label]',
-                'h2 a span:not([class])',
-                'h2 .a-link-normal span',
-                '[data-cy="title-recipe-title"] span',
-
-                # Legacy selectors
-                'h2 a span',
-                '.s-size-mini .s-link-style a',
-                'h2 .a-link-normal',
-                '.s-title-instructions-style h2 a span',
-
-                # Fallback selectors
-                '.s-title .a-link-normal',
-                '.a-size-base-plus',
-                '.a-size-medium',
-                'h2 span'
-            ]
-
-            title = self._extract_text_with_fallback(product_elem, title_selectors)
+            title = self._extract_text_with_fallback(product_elem, self.TITLE_SELECTORS)
             if not title:
                 logger.debug("Amazon: No title found, skipping product")
                 return None
 
             # Extract price with sophisticated parsing
-            price_selectors = [
-                # Primary price selectors
-                '.a-price .a-offscreen',
-                '.a-price-whole',
-                '.a-price-range .a-price .a-offscreen',
-
-                # Alternative price formats
-                '.a-price-symbol + .a-price-whole',
-                '.a-price .a-price-whole',
-                '.a-price-fraction',
-
-                # Deal prices
-                '.a-price.a-text-price .a-offscreen',
-                '.a-price[data-a-color="price"] .a-offscreen',
-
-                # Fallback price selectors
-                '[data-a-color="price"]',
-                '.a-color-price',
-                '.sx-price .a-offscreen'
-            ]
-
-            price_text = self._extract_text_with_fallback(product_elem, price_selectors)
+            price_text = self._extract_text_with_fallback(product_elem, self.PRICE_SELECTORS)
 
             if not price_text:
                 logger.debug("Amazon: No price found, skipping product")
@@ -236,7 +360,7 @@ class AmazonScraper(BaseScraper):
                 return None
 
             # Extract product URL
-            url = self._extract_product_url(product_elem, country)
+            url = self._extract_product_url(href, url_prefix)
             if not url:
                 logger.debug("Amazon: No URL found, skipping product")
                 return None
@@ -247,9 +371,6 @@ class AmazonScraper(BaseScraper):
             availability = self._extract_availability(product_elem)
             image_url = self._extract_image_url(product_elem)
 
-            # Get currency for country
-            currency = self.CURRENCY_MAP.get(country.upper(), 'USD')
-
             return ProductResult(
                 link=url,
                 price=price,
@@ -261,99 +382,61 @@ class AmazonScraper(BaseScraper):
                 seller="Amazon",
                 image_url=image_url,
                 source=self.name,
-                scraped_at=datetime.now().isoformat()
+                scraped_at=scraped_at
             )
 
         except Exception as e:
             logger.debug(f"Amazon: Error parsing product: {e}")
             return None
 
-    def _extract_text_with_fallback(self, element, selectors: List[str]) -> Optional[str]:
+    def _extract_text_with_fallback(self, element, selectors: Tuple[str, ...]) -> Optional[str]:
         """Extract text using multiple selector fallbacks."""
         for selector in selectors:
             try:
-                elem = element.select_one(selector)
+                elem = element.css_first(selector)
                 if elem:
-                    text = elem.get_text(strip=True)
+                    text = elem.text(strip=True)
                     if text and len(text) > 0:
                         return text
             except Exception:
                 continue
         return None
 
-    def _extract_asin_from_url(self, element) -> Optional[str]:
+    def _extract_link_href(self, element) -> str:
+        """Extract the href of the product link, or an empty string."""
+        link_elem = element.css_first('h2 a, .a-link-normal')
+        if link_elem:
+            return link_elem.attributes.get('href') or ''
+        return ''
+
+    def _extract_asin_from_url(self, href: str) -> Optional[str]:
         """Extract ASIN from product URL."""
-        try:
-            link_elem = element.select_one('h2 a, .a-link-normal')
-            if link_elem:
-                href = link_elem.get('href', '')
-                # Extract ASIN from URL pattern /dp/ASIN/ or /gp/product/ASIN/
-                import re
-                match = re.search(r'/(?:dp|gp/product)/([A-Z0-9]{10})', href)
-                if match:
-                    return match.group(1)
-        except Exception:
-            pass
+        # Extract ASIN from URL pattern /dp/ASIN/ or /gp/product/ASIN/
+        match = _ASIN_URL_RE.search(href)
+        if match:
+            return match.group(1)
         return None
 
     def _clean_price(self, price_text: str) -> Optional[str]:
         """Clean and extract numeric price from text."""
-        if not price_text:
-            return None
-
-        import re
-        # Remove currency symbols and extract numbers
-        price_clean = re.sub(r'[^\d.,]', '', price_text)
+        return _clean_price_text(price_text)
 
-        # Handle different decimal separators
-        if ',' in price_clean and '.' in price_clean:
-            # Format like 1,234.56
-            price_clean = price_clean.replace(',', '')
-        elif ',' in price_clean:
-            # Could be European format 1234,56 or thousands separator 1,234
-            if price_clean.count(',') == 1 and len(price_clean.split(',')[1]) <= 2:
-                # Likely decimal separator
-                price_clean = price_clean.replace(',', '.')
-            else:
-                # Likely thousands separator
-                price_clean = price_clean.replace(',', '')
-
-        try:
-            float(price_clean)
-            return price_clean
-        except ValueError:
-            return None
-
-    def _extract_product_url(self, element, country: str) -> Optional[str]:
+    def _extract_product_url(self, href: str, url_prefix: str) -> Optional[str]:
         """Extract product URL."""
-        try:
-            link_elem = element.select_one('h2 a, .a-link-normal')
-            if link_elem:
-                href = link_elem.get('href', '')
-                if href.startswith('/'):
-                    domain = self.AMAZON_DOMAINS.get(country.upper(), 'amazon.com')
-                    return f"https://{domain}{href}"
-                elif href.startswith('http'):
-                    return href
-        except Exception:
-            pass
+        if href.startswith('/'):
+            return url_prefix + href
+        elif href.startswith('http'):
+            return href
         return None
 
     def _extract_rating(self, element) -> Optional[float]:
         """Extract product rating."""
         try:
-            rating_selectors = [
-                '.a-icon-alt',
-                '[aria-label*="stars"]',
-                '.a-star-mini .a-icon-alt'
-            ]
-
-            for selector in rating_selectors:
-                rating_elem = element.select_one(selector)
+            for selector in self.RATING_SELECTORS:
+                rating_elem = element.css_first(selector)
                 if rating_elem:
-                    rating_text = rating_elem.get('aria-label', '') or rating_elem.get_text(strip=True)
-                    import re
-                    match = re.search(r'(\d+\.?\d*)', rating_text)
+                    rating_text = rating_elem.attributes.get('aria-label') or rating_elem.text(strip=True)
+                    match = _NUMBER_RE.search(rating_text)
                     if match:
                         return float(match.group(1))
         except Exception:
@@ -363,19 +446,12 @@ class AmazonScraper(BaseScraper):
     def _extract_reviews_count(self, element) -> Optional[int]:
         """Extract number of reviews."""
         try:
-            reviews_selectors = [
-                '.a-size-base',
-                '[aria-label*="reviews"]',
-                '.a-link-normal .a-size-base'
-            ]
-
-            for selector in reviews_selectors:
-                reviews_elem = element.select_one(selector)
+            for selector in self.REVIEWS_SELECTORS:
+                reviews_elem = element.css_first(selector)
                 if reviews_elem:
-                    reviews_text = reviews_elem.get_text(strip=True)
-                    import re
+                    reviews_text = reviews_elem.text(strip=True)
                     # Look for patterns like "1,234" or "(1,234)"
-                    match = re.search(r'[\(]?([0-9,]+)[\)]?', reviews_text)
+                    match = _REVIEWS_RE.search(reviews_text)
                     if match:
                         count_str = match.group(1).replace(',', '')
                         try:
@@ -389,16 +465,10 @@ class AmazonScraper(BaseScraper):
     def _extract_availability(self, element) -> Optional[str]:
         """Extract availability status."""
         try:
-            availability_selectors = [
-                '.a-size-base.a-color-price',
-                '.a-size-base.a-color-secondary',
-                '[data-cy="delivery-recipe"]'
-            ]
-
-            for selector in availability_selectors:
-                avail_elem = element.select_one(selector)
+            for selector in self.AVAILABILITY_SELECTORS:
+                avail_elem = element.css_first(selector)
                 if avail_elem:
-                    text = avail_elem.get_text(strip=True).lower()
+                    text = avail_elem.text(strip=True).lower()
                     if any(word in text for word in ['stock', 'available', 'delivery', 'ships']):
                         return "In Stock"
                     elif any(word in text for word in ['out', 'unavailable', 'sold']):
@@ -410,16 +480,10 @@ class AmazonScraper(BaseScraper):
     def _extract_image_url(self, element) -> Optional[str]:
         """Extract product image URL."""
         try:
-            img_selectors = [
-                '.s-image',
-                'img[data-src]',
-                'img[src]'
-            ]
-
-            for selector in img_selectors:
-                img_elem = element.select_one(selector)
+            for selector in self.IMAGE_SELECTORS:
+                img_elem = element.css_first(selector)
                 if img_elem:
-                    img_url = img_elem.get('data-src') or img_elem.get('src')
+                    img_url = img_elem.attributes.get('data-src') or img_elem.attributes.get('src')
                     if img_url and img_url.startswith('http'):
                         return img_url
         except Exception:
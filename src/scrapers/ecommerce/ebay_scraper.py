@@ -59,19 +59,18 @@ class EbayScraper(BaseScraper):
             country = 'US'
 
         domain = self.EBAY_DOMAINS[country]
-        encoded_query = quote_plus(query)
+        encoded_query = self._encode_query(query, **kwargs)
 
         # eBay search with Buy It Now filter for better price comparison
         url = f"https://{domain}/sch/i.html"
         params = {
-            '_nkw': query,
             '_sacat': '0',
             'LH_BIN': '1',  # Buy It Now only
             '_sop': '15',   # Sort by price + shipping
             'rt': 'nc'
         }
 
-        param_string = '&'.join([f"{k}={quote_plus(str(v))}" for k, v in params.items()])
+        param_string = '&'.join([f"_nkw={encoded_query}"] + [f"{k}={quote_plus(str(v))}" for k, v in params.items()])
         return f"{url}?{param_string}"
 
     async def search(self, query: str, country: str, **kwargs) -> List[ProductResult]:
@@ -85,7 +84,8 @@ class EbayScraper(BaseScraper):
             async with self.session.get(search_url) as response:
                 if response.status == 200:
                     html = await response.text()
-                    return self._parse_search_results(html, country)
+                    scraped_at = kwargs.get('scraped_at') or datetime.now().isoformat()
+                    return self._parse_search_results(html, country, scraped_at)
                 else:
                     logger.warning(f"eBay: HTTP {response.status}")
                     return []
@@ -94,7 +94,8 @@ class EbayScraper(BaseScraper):
             logger.error(f"eBay search error: {e}")
             return []
 
-    def _parse_search_results(self, html: str, country: str) -> List[ProductResult]:
+    def _parse_search_results(self, html: str, country: str,
+                              scraped_at: Optional[str] = None) -> List[ProductResult]:
         """Parse eBay search results."""
         soup = BeautifulSoup(html, 'lxml')
         results = []
@@ -103,9 +104,12 @@ class EbayScraper(BaseScraper):
         products = soup.select('.s-item')
         logger.info(f"eBay: Found {len(products)} product containers")
 
+        if scraped_at is None:
+            scraped_at = datetime.now().isoformat()
+
         for product in products[:15]:  # Limit results
             try:
-                result = self._parse_product(product, country)
+                result = self._parse_product(product, country, scraped_at)
                 if result:
                     results.append(result)
             except Exception as e:
@@ -115,7 +119,7 @@ class EbayScraper(BaseScraper):
         logger.info(f"eBay: Parsed {len(results)} valid results")
         return results
 
-    def _parse_product(self, product_elem, country: str) -> Optional[ProductResult]:
+    def _parse_product(self, product_elem, country: str, scraped_at: str) -> Optional[ProductResult]:
         """Parse individual eBay product."""
         try:
             # Extract title
@@ -180,7 +184,7 @@ class EbayScraper(BaseScraper):
                 shipping_cost=shipping_cost,
                 image_url=image_url,
                 source=self.name,
-                scraped_at=datetime.now().isoformat()
+                scraped_at=scraped_at
             )
 
         except Exception as e:
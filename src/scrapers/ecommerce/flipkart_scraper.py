@@ -8,7 +8,6 @@ import asyncio
 import re
 from datetime import datetime
 from typing import List, Optional
-from urllib.parse import quote_plus
 
 from loguru import logger
 
@@ -33,7 +32,7 @@ class FlipkartScraper(BaseScraper):
 
     def build_search_url(self, query: str, country: str, **kwargs) -> str:
         """Build Flipkart search URL."""
-        encoded_query = quote_plus(query)
+        encoded_query = self._encode_query(query, **kwargs)
         return f"https://www.flipkart.com/search?q={encoded_query}&sort=relevance"
 
     async def search(self, query: str, country: str, **kwargs) -> List[ProductResult]:
@@ -42,7 +41,7 @@ class FlipkartScraper(BaseScraper):
             logger.warning(f"Flipkart: Country {country} not supported")
             return []
 
-        search_url = self.build_search_url(query, country)
+        search_url = self.build_search_url(query, country, **kwargs)
         logger.info(f"Flipkart: Searching {search_url}")
 
         try:
@@ -60,7 +59,8 @@ class FlipkartScraper(BaseScraper):
             
             if response.status == 200:
                 html_content = await response.text()
-                return await self._parse_search_results(html_content, query)
+                scraped_at = kwargs.get('scraped_at') or datetime.now().isoformat()
+                return await self._parse_search_results(html_content, query, scraped_at)
             else:
                 logger.warning(f"Flipkart: HTTP {response.status}")
                 return []
@@ -69,7 +69,8 @@ class FlipkartScraper(BaseScraper):
             logger.error(f"Flipkart: Search failed: {e}")
             return []
 
-    async def _parse_search_results(self, html: str, query: str) -> List[ProductResult]:
+    async def _parse_search_results(self, html: str, query: str,
+                                    scraped_at: Optional[str] = None) -> List[ProductResult]:
         """Parse Flipkart search results."""
         from bs4 import BeautifulSoup
         
@@ -93,9 +94,12 @@ class FlipkartScraper(BaseScraper):
 
         logger.info(f"Flipkart: Found {len(products)} product containers")
 
+        if scraped_at is None:
+            scraped_at = datetime.now().isoformat()
+
         for product in products[:25]:  # Limit to first 25 results
             try:
-                result = self._parse_product(product)
+                result = self._parse_product(product, scraped_at)
                 if result:
                     results.append(result)
             except Exception as e:
@@ -105,7 +109,7 @@ class FlipkartScraper(BaseScraper):
         logger.info(f"Flipkart: Parsed {len(results)} valid results")
         return results
 
-    def _parse_product(self, product_elem) -> Optional[ProductResult]:
+    def _parse_product(self, product_elem, scraped_at: str) -> Optional[ProductResult]:
         """Parse individual product from Flipkart search results."""
         try:
             # Extract product title
@@ -166,7 +170,7 @@ class FlipkartScraper(BaseScraper):
                 seller="Flipkart",
                 image_url=image_url,
                 source=self.name,
-                scraped_at=datetime.now().isoformat()
+                scraped_at=scraped_at
             )
 
         except Exception as e:
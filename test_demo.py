@@ -113,6 +113,7 @@ async def demo_search():
 
     # Perform search
     response = await fetcher.search(request)
+    await fetcher.aclose()
 
     # Display results
     print(f"✅ Search completed in {response.search_time:.2f} seconds")
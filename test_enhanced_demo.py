@@ -93,11 +93,8 @@ async def test_us_market():
         EnhancedMockScraper("Newegg", 995.0, "USD", "US"),
     ]
     
-    # Create fetcher and replace with mock scrapers
-    fetcher = PriceFetcher()
-    # Clear existing scrapers and add our mock ones
-    fetcher.scrapers.clear()
-    fetcher.scrapers.extend(us_scrapers)
+    # Create fetcher that uses only our mock scrapers
+    fetcher = PriceFetcher(scrapers=us_scrapers)
     
     # Test search
     request = SearchRequest(country="US", query="iPhone 16 Pro, 128GB")
@@ -105,6 +102,7 @@ async def test_us_market():
     start_time = time.time()
     response = await fetcher.search(request)
     end_time = time.time()
+    await fetcher.aclose()
     
     print(f"⏱️  Search completed in {end_time - start_time:.2f} seconds")
     print(f"📊 Found {response.total_results} results from {len(response.sources_used)} sources")
@@ -136,11 +134,8 @@ async def test_indian_market():
         EnhancedMockScraper("Reliance Digital", 79999.0, "INR", "IN"),
     ]
     
-    # Create fetcher and replace with mock scrapers
-    fetcher = PriceFetcher()
-    # Clear existing scrapers and add our mock ones
-    fetcher.scrapers.clear()
-    fetcher.scrapers.extend(indian_scrapers)
+    # Create fetcher that uses only our mock scrapers
+    fetcher = PriceFetcher(scrapers=indian_scrapers)
     
     # Test search
     request = SearchRequest(country="IN", query="iPhone 16 Pro, 128GB")
@@ -148,6 +143,7 @@ async def test_indian_market():
     start_time = time.time()
     response = await fetcher.search(request)
     end_time = time.time()
+    await fetcher.aclose()
     
     print(f"⏱️  Search completed in {end_time - start_time:.2f} seconds")
     print(f"📊 Found {response.total_results} results from {len(response.sources_used)} sources")
@@ -51,9 +51,9 @@ async def test_knowledge_base():
         results = kb.search_knowledge(query, top_k=2)
         
         for i, result in enumerate(results, 1):
-            print(f"  {i}. Score: {result['relevance_score']:.3f}")
-            print(f"     Type: {result['metadata'].get('type', 'unknown')}")
-            print(f"     Content: {result['content'][:100]}...")
+            print(f"  {i}. Score: {result.relevance_score:.3f}")
+            print(f"     Type: {result.metadata.get('type', 'unknown')}")
+            print(f"     Content: {result.content[:100]}...")
     
     # Test alternatives
     print_subsection("Product Alternatives")
@@ -234,6 +234,8 @@ async def test_integrated_rag_search():
         
         print(f"\n" + "="*50)
 
+    await fetcher.aclose()
+
 
 async def test_rag_learning():
     """Test RAG learning capabilities."""
@@ -70,6 +70,8 @@ async def test_us_real_scrapers():
         import traceback
         traceback.print_exc()
         return None
+    finally:
+        await fetcher.aclose()
 
 
 async def test_indian_real_scrapers():
@@ -128,6 +130,8 @@ async def test_indian_real_scrapers():
         import traceback
         traceback.print_exc()
         return None
+    finally:
+        await fetcher.aclose()
 
 
 async def test_different_queries():
@@ -174,6 +178,8 @@ async def test_different_queries():
         # Small delay between requests
         await asyncio.sleep(1)
 
+    await fetcher.aclose()
+
 
 async def main():
     """Run all real scraper tests."""